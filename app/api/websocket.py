@@ -91,7 +91,7 @@ async def send_progress_update(user_id: str, progress_data: dict):
     message = {
         'type': 'progress',
         'data': progress_data,
-        'timestamp': asyncio.get_event_loop().time()
+        'timestamp': asyncio.get_running_loop().time()
     }
     await manager.send_personal_message(message, user_id)
 
@@ -104,7 +104,7 @@ async def send_download_complete(user_id: str, filename: str, filesize: int = No
             'filesize': filesize,
             'message': 'Download completed successfully!'
         },
-        'timestamp': asyncio.get_event_loop().time()
+        'timestamp': asyncio.get_running_loop().time()
     }
     await manager.send_personal_message(message, user_id)
 
@@ -116,6 +116,6 @@ async def send_download_error(user_id: str, error_message: str):
             'error': error_message,
             'message': 'Download failed'
         },
-        'timestamp': asyncio.get_event_loop().time()
+        'timestamp': asyncio.get_running_loop().time()
     }
     await manager.send_personal_message(message, user_id)
\ No newline at end of file
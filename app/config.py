@@ -36,6 +36,18 @@ class Settings:
     # Download limits
     MAX_VIDEO_DURATION = 3600  # 1 hour
     MAX_CONCURRENT_DOWNLOADS = 3
+    FACEBOOK_CONCURRENT_FRAGMENTS = int(os.getenv("FACEBOOK_CONCURRENT_FRAGMENTS", "12"))
+    TIKTOK_CONCURRENT_FRAGMENTS = int(os.getenv("TIKTOK_CONCURRENT_FRAGMENTS", "8"))
+    YOUTUBE_CONCURRENT_FRAGMENTS = int(os.getenv("YOUTUBE_CONCURRENT_FRAGMENTS", "8"))
+    TWITTER_CONCURRENT_FRAGMENTS = int(os.getenv("TWITTER_CONCURRENT_FRAGMENTS", "16"))
+    # The mobile API fallback is stricter about parallel requests
+    TWITTER_FALLBACK_CONCURRENT_FRAGMENTS = int(os.getenv("TWITTER_FALLBACK_CONCURRENT_FRAGMENTS", "4"))
+    EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 2))))
+    DOWNLOAD_THREADS = int(os.getenv("DOWNLOAD_THREADS", "8"))
+    METADATA_CACHE_TTL = int(os.getenv("METADATA_CACHE_TTL", "900"))
+    # Try all Twitter info configs at once instead of one after another (triples request load)
+    TWITTER_PARALLEL_INFO = os.getenv("TWITTER_PARALLEL_INFO", "False").lower() == "true"
+    BANDWIDTH_STATE_PATH = DB_PATH.parent / "bandwidth.json"
     
     # Cleanup settings
     CLEANUP_INTERVAL_SECONDS = 60
@@ -1,12 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, List, Tuple
+import copy
 import tempfile
+import math
 import os
+import stat
 import asyncio
+import uuid
 from pathlib import Path
 import yt_dlp
 import ffmpeg
 from ..utils.logger import logger
+from ..utils.executors import get_download_executor
+
+# Output containers yt-dlp may produce, in order of preference
+_VIDEO_EXTENSIONS = {ext: rank for rank, ext in enumerate(
+    ('.mp4', '.webm', '.mkv', '.mov', '.avi', '.flv', '.m4v', '.3gp')
+)}
 
 class BaseDownloader(ABC):
     """Base class for all platform downloaders"""
@@ -25,9 +35,22 @@ class BaseDownloader(ABC):
         if self.progress_callback:
             self.progress_callback(progress_data)
     
+    def reload_cookie_cache(self):
+        """Forget per-downloader cookie state after the cookies file is replaced
+
+        The default has nothing to forget. Overrides drop cached file checks or info
+        extracted with the old cookies. yt-dlp instances are not affected: ydl_pool never
+        pools options that carry a cookiefile, so the next extraction reads the file again.
+        """
+        pass
+    
     @abstractmethod
-    async def get_video_info(self, url: str) -> Dict[str, Any]:
-        """Get video metadata without downloading"""
+    async def get_video_info(self, url: str, lightweight: bool = False) -> Dict[str, Any]:
+        """Get video metadata without downloading
+
+        ``lightweight`` asks for a cheaper extraction that is only guaranteed to fill
+        title, duration and thumbnail; platforms without one ignore it.
+        """
         pass
     
     @abstractmethod
@@ -44,6 +67,74 @@ class BaseDownloader(ABC):
             dir=self.temp_dir
         )
 
+    def create_temp_path(self, suffix=".mp4") -> Path:
+        """Return a unique temp path without creating the file (for yt-dlp output templates)"""
+        return self.temp_dir / f"tmp{uuid.uuid4().hex}{suffix}"
+
+    @staticmethod
+    def _safe_int(value: Any, default: int = 0) -> int:
+        """Coerce a yt-dlp numeric field to int, branching on type instead of catching errors"""
+        if isinstance(value, int):
+            return value
+        if isinstance(value, float):
+            return int(value) if math.isfinite(value) else default
+        if isinstance(value, str):
+            value = value.strip()
+            if value.removeprefix('-').isdecimal():
+                return int(value)
+        return default
+
+    @staticmethod
+    def _section_download_ranges(start_time: Optional[float], end_time: Optional[float]):
+        """Build a yt-dlp ``download_ranges`` callback so only the requested span is fetched"""
+        start = max(float(start_time or 0), 0.0)
+        end = max(float(end_time), 0.0) if end_time is not None else math.inf
+        if end <= start:
+            raise ValueError("Trim end time must be greater than start time.")
+        return yt_dlp.utils.download_range_func(None, [(start, end)])
+
+    @staticmethod
+    def _reported_filepath(info: Optional[Dict[str, Any]]) -> Optional[Path]:
+        """Return the final output path yt-dlp recorded for a download, following playlist entries"""
+        while info:
+            downloads = info.get('requested_downloads')
+            if downloads and downloads[0].get('filepath'):
+                return Path(downloads[0]['filepath'])
+            entries = [entry for entry in info.get('entries') or () if entry]
+            info = entries[0] if entries else None
+        return None
+
+    @staticmethod
+    def _file_size(path: Optional[Path]) -> int:
+        """Size of a regular file in bytes, or 0 if it is missing, using a single stat call"""
+        if path is None:
+            return 0
+        try:
+            st = os.stat(path)
+        except OSError:
+            return 0
+        return st.st_size if stat.S_ISREG(st.st_mode) else 0
+
+    def _find_output_files(self, directory: Path, stem: str) -> List[Tuple[Path, int]]:
+        """Return ``(path, size)`` for video files named after ``stem``, best match first"""
+        prefix = f"{stem}."
+        matches = []
+        # One directory pass; DirEntry caches the stat so files aren't re-stat'ed via Path
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.startswith(prefix):
+                    continue
+                suffix = os.path.splitext(entry.name)[1].lower()
+                rank = _VIDEO_EXTENSIONS.get(suffix)
+                if rank is None or not entry.is_file(follow_symlinks=False):
+                    continue
+                exact = entry.name == stem + suffix
+                size = entry.stat(follow_symlinks=False).st_size
+                matches.append(((not exact, rank), Path(entry.path), size))
+
+        matches.sort(key=lambda match: match[0])
+        return [(path, size) for _, path, size in matches]
+
     def _apply_common_ydl_options(self, options: Dict[str, Any]) -> Dict[str, Any]:
         """Normalize yt-dlp options for consistent mp4 outputs."""
         opts = options
@@ -65,8 +156,6 @@ class BaseDownloader(ABC):
     async def _ensure_quicktime_compat(self, filepath: Path) -> Path:
         """Re-encode the file if needed so it plays with QuickTime and keeps audio."""
 
-        loop = asyncio.get_event_loop()
-
         def convert_if_required() -> Path:
             try:
                 probe = ffmpeg.probe(str(filepath))
@@ -141,16 +230,7 @@ class BaseDownloader(ABC):
                         pass
                 return filepath
 
-        return await loop.run_in_executor(None, convert_if_required)
-    
-    async def cleanup_file(self, filepath: Path, delay: int = 5):
-        """Delete file after delay"""
-        await asyncio.sleep(delay)
-        try:
-            if filepath.exists():
-                os.unlink(filepath)
-        except:
-            pass
+        return await asyncio.to_thread(convert_if_required)
     
     async def wait_for_file_write(self, filepath: Path, max_wait: int = 10) -> bool:
         """Wait for file to be fully written"""
@@ -183,26 +263,21 @@ class BaseDownloader(ABC):
         return False
     
     async def verify_and_retry_download(self, url: str, ydl_opts: dict, max_retries: int = 3,
-                                        apply_common_opts: bool = True) -> Path:
-        """Download with verification and automatic retry"""
-        import tempfile
+                                        apply_common_opts: bool = True,
+                                        ie_result: Optional[Dict[str, Any]] = None) -> Path:
+        """Download with verification and automatic retry
+
+        ``ie_result`` is an info dict from an earlier extraction; when given, yt-dlp
+        downloads from it directly instead of extracting ``url`` again.
+        """
         import time
 
         for attempt in range(max_retries):
             logger.info(f"Download attempt {attempt + 1}/{max_retries} for {url}")
             
-            # Create unique temp file for this attempt
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4', dir=self.temp_dir)
-            temp_file.close()
-            temp_path = Path(temp_file.name)
+            # Unique output path for this attempt; yt-dlp creates the file itself
+            temp_path = self.create_temp_path()
             stem = temp_path.stem
-
-            # Remove the placeholder file so yt-dlp can create the real one
-            if temp_path.exists():
-                try:
-                    temp_path.unlink()
-                except OSError:
-                    pass
             
             # Update output template for this attempt
             attempt_opts = ydl_opts.copy()
@@ -212,54 +287,47 @@ class BaseDownloader(ABC):
             attempt_opts.setdefault('overwrites', True)
             
             try:
-                # Download with yt-dlp
-                with yt_dlp.YoutubeDL(attempt_opts) as ydl:
-                    ydl.download([url])
+                # Download with yt-dlp off the event loop
+                def run_download() -> Optional[Path]:
+                    with yt_dlp.YoutubeDL(attempt_opts) as ydl:
+                        if ie_result is not None:
+                            # process_ie_result mutates the dict, so keep the caller's copy intact
+                            info = ydl.process_ie_result(copy.deepcopy(ie_result), download=True)
+                        else:
+                            info = ydl.extract_info(url, download=True)
+                    return self._reported_filepath(info)
+
+                reported_file = await asyncio.get_running_loop().run_in_executor(get_download_executor(), run_download)
                 
                 # Wait for file to be fully written
                 await asyncio.sleep(2)  # Initial wait
                 
-                # Find the actual downloaded file
+                # Prefer the path yt-dlp reports; scan the temp dir only if it didn't report one
+                reported_size = self._file_size(reported_file)
+                if reported_size:
+                    candidates = [(reported_file, reported_size)]
+                else:
+                    candidates = self._find_output_files(temp_path.parent, stem)
+
                 downloaded_file = None
-                
-                # Check for various file extensions
-                for ext in ['.mp4', '.webm', '.mkv', '.mov', '.avi', '.flv', '.m4v', '.3gp']:
-                    potential_file = temp_path.parent / f"{stem}.{ext}"
-                    if potential_file.exists():
-                        # Wait and verify file is fully written
-                        if await self.wait_for_file_write(potential_file, max_wait=15):
-                            file_size = potential_file.stat().st_size
-                            if file_size > 1024:  # At least 1KB
-                                logger.info(f"Successfully downloaded {file_size} bytes to {potential_file}")
-                                downloaded_file = potential_file
-                                break
-                            else:
-                                logger.warning(f"File too small: {file_size} bytes")
-                                # Clean up small file
-                                try:
-                                    potential_file.unlink()
-                                except:
-                                    pass
-                        else:
-                            logger.warning(f"File write timeout for {potential_file}")
-                
-                # Check for similar named files (yt-dlp sometimes adds suffixes)
-                if not downloaded_file:
-                    temp_dir = temp_path.parent
-                    for file in temp_dir.glob(f"{stem}*"):
-                        if file.is_file() and any(file.suffix.lower() == ext for ext in ['.mp4', '.webm', '.mkv', '.mov', '.avi', '.flv', '.m4v', '.3gp']):
-                            if await self.wait_for_file_write(file, max_wait=15):
-                                file_size = file.stat().st_size
-                                if file_size > 1024:
-                                    logger.info(f"Successfully downloaded {file_size} bytes to {file}")
-                                    downloaded_file = file
-                                    break
-                                else:
-                                    logger.warning(f"File too small: {file_size} bytes")
-                                    try:
-                                        file.unlink()
-                                    except:
-                                        pass
+                for candidate, _ in candidates:
+                    # Wait and verify file is fully written
+                    if not await self.wait_for_file_write(candidate, max_wait=15):
+                        logger.warning(f"File write timeout for {candidate}")
+                        continue
+
+                    file_size = candidate.stat().st_size
+                    if file_size > 1024:  # At least 1KB
+                        logger.info(f"Successfully downloaded {file_size} bytes to {candidate}")
+                        downloaded_file = candidate
+                        break
+
+                    logger.warning(f"File too small: {file_size} bytes")
+                    # Clean up small file
+                    try:
+                        candidate.unlink()
+                    except:
+                        pass
                 
                 if downloaded_file:
                     # Final verification
@@ -293,15 +361,24 @@ class BaseDownloader(ABC):
                 
             except Exception as e:
                 logger.error(f"Download attempt {attempt + 1} failed: {str(e)}")
+
+                if 'HTTP Error 429' in str(e) or 'Too Many Requests' in str(e):
+                    # Only pace requests once the site starts throttling us
+                    backoff = 2 ** (attempt + 1)
+                    ydl_opts = {
+                        **ydl_opts,
+                        'sleep_interval': backoff,
+                        'max_sleep_interval': backoff * 2,
+                        'sleep_interval_requests': backoff,
+                    }
+                    logger.warning(f"Rate limited on {url}; pacing retries at {backoff}-{backoff * 2}s")
                 
                 # Clean up any temp files
-                for ext in ['.mp4', '.webm', '.mkv', '.mov', '.avi', '.flv', '.m4v', '.3gp']:
-                    potential_file = temp_path.parent / f"{stem}.{ext}"
-                    if potential_file.exists():
-                        try:
-                            potential_file.unlink()
-                        except:
-                            pass
+                for partial_file, _ in self._find_output_files(temp_path.parent, stem):
+                    try:
+                        partial_file.unlink()
+                    except:
+                        pass
                 
                 if temp_path.exists():
                     try:
@@ -1,17 +1,89 @@
 import yt_dlp
 import asyncio
+import os
 import re
-import time
-from copy import deepcopy
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, unquote
 
 import httpx
 
 from .base import BaseDownloader
+from ..config import settings
 from ..utils.video_processor import VideoProcessor
 from ..utils.logger import logger
+from ..utils.file_reaper import file_reaper
+from ..utils.ydl_pool import ydl_pool
+from ..utils.executors import get_download_executor
+
+_FB_CRAWLER_UA = 'facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)'
+
+# Shared request headers; yt-dlp and httpx copy them, so they are never mutated
+_DESKTOP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+_MOBILE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_2_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Mobile/15E148 Safari/604.1',
+}
+
+_SHARE_LINK_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+# Facebook crawler user-agent often receives canonical URLs without login prompts
+_FB_CRAWLER_HEADERS = {
+    'User-Agent': _FB_CRAWLER_UA,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+_MP4_CONVERTOR = {'key': 'FFmpegVideoConvertor', 'preferedformat': 'mp4'}
+
+_DOWNLOAD_BASE_CONFIG = {
+    'quiet': True,
+    'no_warnings': True,
+    'no_playlist': True,
+    'retries': 3,
+    'fragment_retries': 3,
+    'file_access_retries': 3,
+    'extractor_retries': 3,
+}
+
+# Download configs, tried in order; 'format' defaults to the requested format and 'outtmpl' is set per call
+_DOWNLOAD_CONFIGS = (
+    {
+        **_DOWNLOAD_BASE_CONFIG,
+        'sleep_interval': 0,
+        'sleep_interval_requests': 0,
+        'concurrent_fragment_downloads': settings.FACEBOOK_CONCURRENT_FRAGMENTS,
+        'postprocessors': [_MP4_CONVERTOR],
+    },
+    {
+        **_DOWNLOAD_BASE_CONFIG,
+        'http_headers': _DESKTOP_HEADERS,
+        'sleep_interval': 2,
+        'sleep_interval_requests': 2,
+        'concurrent_fragment_downloads': 3,
+    },
+    {
+        **_DOWNLOAD_BASE_CONFIG,
+        'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
+        'http_headers': _MOBILE_HEADERS,
+        'sleep_interval': 3,
+        'sleep_interval_requests': 3,
+        'concurrent_fragment_downloads': 1,
+        'postprocessors': [_MP4_CONVERTOR],
+    },
+)
 
 class FacebookDownloader(BaseDownloader):
     
@@ -26,19 +98,7 @@ class FacebookDownloader(BaseDownloader):
             logger.info(f"Resolved Facebook share link via oEmbed to {oembed_url}")
             return oembed_url
 
-        header_sets = [
-            {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-            },
-            {
-                # Facebook crawler user-agent often receives canonical URLs without login prompts
-                'User-Agent': 'facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-            }
-        ]
+        header_sets = (_SHARE_LINK_HEADERS, _FB_CRAWLER_HEADERS)
 
         for headers in header_sets:
             try:
@@ -99,7 +159,7 @@ class FacebookDownloader(BaseDownloader):
                 'https://www.facebook.com/plugins/video/oembed.json/',
                 params={'url': url, 'omitscript': 'true'},
                 headers={
-                    'User-Agent': 'facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)',
+                    'User-Agent': _FB_CRAWLER_UA,
                     'Accept': 'application/json'
                 },
                 timeout=httpx.Timeout(6.0, connect=4.0)
@@ -210,8 +270,8 @@ class FacebookDownloader(BaseDownloader):
         # Default: return normalized URL
         return clean_url
     
-    async def get_video_info(self, url: str) -> Dict[str, Any]:
-        """Get Facebook video metadata"""
+    async def get_video_info(self, url: str, lightweight: bool = False) -> Dict[str, Any]:
+        """Get Facebook video metadata (there is no cheaper path, so ``lightweight`` is ignored)"""
         # Clean and normalize URL
         clean_url = self._extract_facebook_url(url)
         
@@ -228,15 +288,7 @@ class FacebookDownloader(BaseDownloader):
                 'quiet': True,
                 'no_warnings': True,
                 'extract_flat': False,
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.5',
-                    'Accept-Encoding': 'gzip, deflate',
-                    'DNT': '1',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1',
-                }
+                'http_headers': _DESKTOP_HEADERS
             },
             # Config with different extractor
             {
@@ -251,15 +303,13 @@ class FacebookDownloader(BaseDownloader):
             }
         ]
         
-        loop = asyncio.get_event_loop()
-        
         for i, config in enumerate(configs):
             try:
                 def extract_info():
-                    with yt_dlp.YoutubeDL(config) as ydl:
+                    with ydl_pool.acquire(config) as ydl:
                         return ydl.extract_info(clean_url, download=False)
                 
-                info = await loop.run_in_executor(None, extract_info)
+                info = await asyncio.get_running_loop().run_in_executor(get_download_executor(), extract_info)
                 
                 return {
                     'title': info.get('title', info.get('description', 'Facebook Video')),
@@ -284,184 +334,36 @@ class FacebookDownloader(BaseDownloader):
         # Clean and normalize URL
         clean_url = self._extract_facebook_url(url)
         
-        temp_file = self.create_temp_file()
-        temp_file.close()
-        output_path = Path(temp_file.name)
-        stem = output_path.stem
-
-        # Remove placeholder file so yt-dlp creates the real artifact
-        if output_path.exists():
-            try:
-                output_path.unlink()
-            except OSError:
-                pass
+        # yt-dlp creates the real artifact, so only reserve a name; the template is the same for every config
+        output_path = self.create_temp_path()
+        outtmpl = str(output_path.parent / f"{output_path.stem}.%(ext)s")
         
         # Normalize default format to capture audio + video when possible
         normalized_format = format_id
         if normalized_format == 'best':
             normalized_format = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/bestvideo+bestaudio/best[ext=mp4]/best'
 
-        # Try multiple download configurations
-        download_configs = [
-            {
-                'format': normalized_format,
-                'outtmpl': str(output_path.parent / f"{output_path.stem}.%(ext)s"),
-                'quiet': True,
-                'no_warnings': True,
-                'no_playlist': True,
-                'retries': 3,
-                'fragment_retries': 3,
-                'file_access_retries': 3,
-                'extractor_retries': 3,
-                'sleep_interval': 2,
-                'sleep_interval_requests': 2,
-                'concurrent_fragment_downloads': 3,
-                'postprocessors': [{
-                    'key': 'FFmpegVideoConvertor',
-                    'preferedformat': 'mp4',
-                }],
-            },
-            {
-                'format': normalized_format,
-                'outtmpl': str(output_path.parent / f"{output_path.stem}.%(ext)s"),
-                'quiet': True,
-                'no_warnings': True,
-                'no_playlist': True,
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.5',
-                    'Accept-Encoding': 'gzip, deflate',
-                    'DNT': '1',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1',
-                },
-                'retries': 3,
-                'fragment_retries': 3,
-                'file_access_retries': 3,
-                'extractor_retries': 3,
-                'sleep_interval': 2,
-                'sleep_interval_requests': 2,
-                'concurrent_fragment_downloads': 3,
-            },
-            {
-                'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
-                'outtmpl': str(output_path.parent / f"{output_path.stem}.%(ext)s"),
-                'quiet': True,
-                'no_warnings': True,
-                'no_playlist': True,
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_2_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Mobile/15E148 Safari/604.1',
-                },
-                'retries': 3,
-                'fragment_retries': 3,
-                'file_access_retries': 3,
-                'extractor_retries': 3,
-                'sleep_interval': 3,
-                'sleep_interval_requests': 3,
-                'concurrent_fragment_downloads': 1,
-                'postprocessors': [{
-                    'key': 'FFmpegVideoConvertor',
-                    'preferedformat': 'mp4',
-                }],
-            }
-        ]
-        
-        loop = asyncio.get_event_loop()
-        
         # Try different configurations until one works
+        loop = asyncio.get_running_loop()
         last_error = None
-        for raw_config in download_configs:
-            config = deepcopy(raw_config)
-            config.setdefault('overwrites', True)
+        for base_config in _DOWNLOAD_CONFIGS:
+            # Shallow copy; only the postprocessors list gets appended to later
+            config = {'format': normalized_format, 'overwrites': True, **base_config}
+            config['postprocessors'] = list(base_config.get('postprocessors', ()))
             try:
                 if start_time is not None or end_time is not None:
                     # Download full video first
-                    temp_full = self.create_temp_file()
-                    temp_full.close()
-                    temp_full_path = Path(temp_full.name)
-                    temp_stem = temp_full_path.stem
-
-                    if temp_full_path.exists():
-                        try:
-                            temp_full_path.unlink()
-                        except OSError:
-                            pass
-
-                    config['outtmpl'] = str(temp_full_path.parent / f"{temp_stem}.%(ext)s")
+                    temp_full_path = self.create_temp_path()
+                    config['outtmpl'] = str(temp_full_path.parent / f"{temp_full_path.stem}.%(ext)s")
                     config = self._apply_common_ydl_options(config)
             
-                    def download_video():
-                        try:
-                            # Add progress hook for debugging
-                            def debug_hook(d):
-                                if d['status'] == 'error':
-                                    logger.error(f"Facebook download error: {d.get('error', 'Unknown error')}")
-                                elif d['status'] == 'finished':
-                                    logger.info(f"Facebook download finished: {d.get('filename')}")
-                            
-                            config['progress_hooks'] = [debug_hook]
-                            
-                            with yt_dlp.YoutubeDL(config) as ydl:
-                                ydl.download([clean_url])
-                                # Find actual file
-                                found_files = []
-                                for ext in ['.mp4', '.webm', '.mkv']:
-                                    potential_file = temp_full_path.parent / f"{temp_stem}.{ext}"
-                                    if potential_file.exists():
-                                        found_files.append(potential_file)
-                                        # Verify file has content
-                                        file_size = potential_file.stat().st_size
-                                        logger.info(f"Found Facebook downloaded file: {potential_file}, size: {file_size} bytes")
-                                        if file_size > 1024:
-                                            return potential_file
-                                        else:
-                                            logger.warning(f"Facebook downloaded file is empty: {potential_file}")
-                                            try:
-                                                potential_file.unlink()
-                                            except OSError:
-                                                pass
-                                
-                                # List all files in directory for debugging
-                                temp_dir = temp_full_path.parent
-                                all_files = list(temp_dir.glob(f"{temp_stem}*"))
-                                logger.warning(f"All files in Facebook temp directory: {all_files}")
-                                
-                                # Check for any potential matches
-                                for file in all_files:
-                                    if file.is_file():
-                                        file_size = file.stat().st_size
-                                        logger.warning(f"Facebook potential match: {file}, size: {file_size} bytes")
-                                        if file_size > 1024:
-                                            return file
-                                        try:
-                                            file.unlink()
-                                        except OSError:
-                                            pass
-                                
-                                # Fallback
-                                logger.warning(f"No valid Facebook downloaded file found for stem: {temp_stem}")
-                                logger.warning(f"Files found: {found_files}")
-                                raise ValueError("Facebook download produced no usable file")
-                        except Exception as e:
-                            logger.error(f"Facebook download failed with exception: {str(e)}")
-                            raise
-                    
-                    downloaded_file = await loop.run_in_executor(None, download_video)
-
-                    if not downloaded_file.exists():
-                        raise ValueError("Facebook download file missing after completion")
+                    downloaded_file, initial_size = await loop.run_in_executor(
+                        get_download_executor(), self._run_ydl_and_find_output, config, clean_url, temp_full_path, "Facebook download"
+                    )
 
                     # Give the filesystem a moment to settle and ensure size is stable
-                    previous_size = -1
-                    for _ in range(3):
-                        current_size = downloaded_file.stat().st_size
-                        if current_size == previous_size:
-                            break
-                        previous_size = current_size
-                        time.sleep(0.5)
-
-                    if downloaded_file.stat().st_size <= 1024:
+                    final_size = await self._wait_for_stable_size(downloaded_file, initial_size)
+                    if final_size <= 1024:
                         raise ValueError("Facebook download resulted in an empty file")
                     
                     # Trim video
@@ -474,94 +376,19 @@ class FacebookDownloader(BaseDownloader):
                     )
                     
                     # Clean up
-                    asyncio.create_task(self.cleanup_file(downloaded_file, delay=1))
+                    file_reaper.schedule(downloaded_file, delay=1)
                     
                     return trimmed_path
                 else:
-                    config['outtmpl'] = str(output_path.parent / f"{stem}.%(ext)s")
+                    config['outtmpl'] = outtmpl
                     config = self._apply_common_ydl_options(config)
 
-                    def download_video():
-                        try:
-                            # Add progress hook for debugging
-                            def debug_hook(d):
-                                if d['status'] == 'error':
-                                    logger.error(f"Facebook direct download error: {d.get('error', 'Unknown error')}")
-                                elif d['status'] == 'finished':
-                                    logger.info(f"Facebook direct download finished: {d.get('filename')}")
-                            
-                            config['progress_hooks'] = [debug_hook]
-                            
-                            with yt_dlp.YoutubeDL(config) as ydl:
-                                ydl.download([clean_url])
-                                stem = output_path.stem
-                                found_files = []
-                                for ext in ['.mp4', '.webm', '.mkv']:
-                                    potential_file = output_path.parent / f"{stem}.{ext}"
-                                    if potential_file.exists():
-                                        found_files.append(potential_file)
-                                        # Verify file has content
-                                        file_size = potential_file.stat().st_size
-                                        logger.info(f"Found Facebook direct downloaded file: {potential_file}, size: {file_size} bytes")
-                                        if file_size > 1024:
-                                            return potential_file
-                                        else:
-                                            logger.warning(f"Facebook direct downloaded file is empty: {potential_file}")
-                                            try:
-                                                potential_file.unlink()
-                                            except OSError:
-                                                pass
-                                
-                                # Check original output path
-                                if output_path.exists():
-                                    file_size = output_path.stat().st_size
-                                    logger.info(f"Facebook original output file size: {file_size} bytes")
-                                    if file_size > 1024:
-                                        return output_path
-                                    try:
-                                        output_path.unlink()
-                                    except OSError:
-                                        pass
-                                
-                                # List all files in directory for debugging
-                                temp_dir = output_path.parent
-                                all_files = list(temp_dir.glob(f"{stem}*"))
-                                logger.warning(f"All files in Facebook direct temp directory: {all_files}")
-                                
-                                # Check for any potential matches
-                                for file in all_files:
-                                    if file.is_file():
-                                        file_size = file.stat().st_size
-                                        logger.warning(f"Facebook direct potential match: {file}, size: {file_size} bytes")
-                                        if file_size > 1024:
-                                            return file
-                                        try:
-                                            file.unlink()
-                                        except OSError:
-                                            pass
-                                
-                                # Fallback
-                                logger.warning(f"No valid Facebook direct downloaded file found for stem: {stem}")
-                                logger.warning(f"Files found: {found_files}")
-                                raise ValueError("Facebook direct download produced no usable file")
-                        except Exception as e:
-                            logger.error(f"Facebook direct download failed with exception: {str(e)}")
-                            raise
-                    
-                    downloaded_file = await loop.run_in_executor(None, download_video)
-
-                    if not downloaded_file.exists():
-                        raise ValueError("Facebook direct download file missing after completion")
-
-                    previous_size = -1
-                    for _ in range(3):
-                        current_size = downloaded_file.stat().st_size
-                        if current_size == previous_size:
-                            break
-                        previous_size = current_size
-                        time.sleep(0.5)
+                    downloaded_file, initial_size = await loop.run_in_executor(
+                        get_download_executor(), self._run_ydl_and_find_output, config, clean_url, output_path, "Facebook direct download"
+                    )
 
-                    if downloaded_file.stat().st_size <= 1024:
+                    final_size = await self._wait_for_stable_size(downloaded_file, initial_size)
+                    if final_size <= 1024:
                         raise ValueError("Facebook direct download resulted in an empty file")
 
                     # Ensure MP4 compatibility
@@ -571,7 +398,7 @@ class FacebookDownloader(BaseDownloader):
                     
                     # Clean up original if different
                     if final_path != downloaded_file:
-                        asyncio.create_task(self.cleanup_file(downloaded_file, delay=1))
+                        file_reaper.schedule(downloaded_file, delay=1)
                     
                     return final_path
                     
@@ -583,16 +410,72 @@ class FacebookDownloader(BaseDownloader):
         if last_error:
             raise Exception(f"Could not download Facebook video after multiple attempts: {str(last_error)}")
     
+    def _run_ydl_and_find_output(self, config: Dict[str, Any], url: str,
+                                 target: Path, label: str) -> Tuple[Path, int]:
+        """Run yt-dlp and return the produced file together with its size"""
+
+        def debug_hook(d):
+            if d['status'] == 'error':
+                logger.error(f"{label} error: {d.get('error', 'Unknown error')}")
+            elif d['status'] == 'finished':
+                logger.info(f"{label} finished: {d.get('filename')}")
+
+        config['progress_hooks'] = [debug_hook]
+
+        try:
+            with yt_dlp.YoutubeDL(config) as ydl:
+                info = ydl.extract_info(url, download=True)
+        except Exception as e:
+            logger.error(f"{label} failed with exception: {str(e)}")
+            raise
+
+        # yt-dlp reports the final (post-merge) path; only scan when it doesn't
+        reported = self._reported_filepath(info)
+        reported_size = self._file_size(reported)
+        if reported_size > 1024:
+            logger.info(f"Found {label} file: {reported}, size: {reported_size} bytes")
+            return reported, reported_size
+
+        stem = target.stem
+        for candidate, size in self._find_output_files(target.parent, stem):
+            logger.info(f"Found {label} file: {candidate}, size: {size} bytes")
+            if size > 1024:
+                return candidate, size
+
+            logger.warning(f"{label} file is empty: {candidate}")
+            try:
+                os.unlink(candidate)
+            except OSError:
+                pass
+
+        logger.warning(f"No valid {label} file found for stem: {stem}")
+        raise ValueError(f"{label} produced no usable file")
+
+    async def _wait_for_stable_size(self, filepath: Path, previous_size: int) -> int:
+        """Give the filesystem a moment to settle and return the last observed size"""
+        for _ in range(3):
+            await asyncio.sleep(0.5)
+            current_size = os.stat(filepath).st_size
+            if current_size == previous_size:
+                break
+            previous_size = current_size
+        return previous_size
+
     def _get_available_formats(self, info: Dict) -> list:
         """Extract available formats"""
-        formats = []
-        for f in info.get('formats', []):
-            if f.get('vcodec') != 'none':
-                formats.append({
+        safe_int = self._safe_int
+        return sorted(
+            (
+                {
                     'format_id': f['format_id'],
                     'ext': f.get('ext', 'mp4'),
                     'resolution': f.get('resolution', f.get('height', 'Unknown')),
-                    'filesize': f.get('filesize', 0),
-                    'quality': f.get('quality', f.get('height', 0))
-                })
-        return sorted(formats, key=lambda x: x.get('quality', 0), reverse=True)
+                    'filesize': safe_int(f.get('filesize')),
+                    'quality': safe_int(f.get('quality') or f.get('height')),
+                }
+                for f in info.get('formats', ())
+                if f.get('vcodec') != 'none'
+            ),
+            key=itemgetter('quality'),
+            reverse=True
+        )
@@ -1,44 +1,115 @@
-import yt_dlp
 import asyncio
-import tempfile
+import logging
+import os
+import shutil
+import time
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from operator import itemgetter
 from pathlib import Path
+from types import MappingProxyType
 from typing import Optional, Dict, Any, Tuple
+from urllib.parse import urlsplit
 
 import httpx
 from .base import BaseDownloader
 from ..config import settings
-from ..utils.video_processor import VideoProcessor
 from ..utils.logger import logger
+from ..utils.file_reaper import file_reaper
+from ..utils.executors import get_extract_pool, extract_info_remote
+from ..utils.metadata_cache import metadata_cache
+from ..utils.bw_estimator import bw_estimator
+
+_IOS_USER_AGENT = 'Mozilla/5.0 (iPhone; CPU iPhone OS 16_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1'
+
+# Shared request headers; yt-dlp and httpx copy them, so they are never mutated.
+# yt-dlp options are pickled to extraction workers, so their headers stay a plain dict.
+_IOS_HEADERS = {
+    'User-Agent': _IOS_USER_AGENT,
+    'Referer': 'https://www.tiktok.com/',
+}
+
+_PREFETCH_HEADERS = MappingProxyType({
+    'User-Agent': _IOS_USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Referer': 'https://www.tiktok.com/',
+})
+
+# Extraction errors that mean TikTok wants a browser session before serving the video
+_COOKIE_REQUIRED_MARKERS = ('HTTP Error 401', 'HTTP Error 403', 'Unable to extract webpage video data')
+
+_COOKIE_FILE_HEADER = b'# Netscape HTTP Cookie File\n# This file was generated by the TikTok downloader\n\n'
+
+# Bandwidth estimates are tracked per CDN family rather than per edge hostname
+_BANDWIDTH_HOST = 'tiktok.com'
+_MIN_HTTP_CHUNK_SIZE = 1024 * 1024
+
+# Use aria2c for full downloads when it is installed, otherwise yt-dlp's native downloader
+_ARIA2C_PATH = shutil.which('aria2c')
+_ARIA2C_ARGS = ['-x', '16', '-k', '1M', '--file-allocation=none', '--enable-http-keep-alive=true']
+
+# Shared keep-alive client for cookie prefetching, created lazily on first use
+_cookie_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_cookie_client() -> httpx.AsyncClient:
+    global _cookie_client
+    if _cookie_client is None or _cookie_client.is_closed:
+        _cookie_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=300),
+            # Refuse to store cookies on the shared client; each prefetch collects its own
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+        )
+    return _cookie_client
+
+
+async def close_cookie_client():
+    """Close the shared cookie prefetch client (called on app shutdown)"""
+    global _cookie_client
+    if _cookie_client is not None:
+        await _cookie_client.aclose()
+        _cookie_client = None
 
 class TikTokDownloader(BaseDownloader):
-    
-    async def get_video_info(self, url: str) -> Dict[str, Any]:
-        """Get TikTok video metadata"""
-        cookie_file, cleanup_cookie = await self._resolve_cookie_file(url)
 
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': False,
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 16_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1',
-                'Referer': 'https://www.tiktok.com/',
-            }
-        }
-
-        if cookie_file:
-            ydl_opts['cookiefile'] = str(cookie_file)
-        
-        loop = asyncio.get_event_loop()
+    # Generated cookie files are reused for this many seconds before being refreshed
+    COOKIE_CACHE_TTL = 120
+    # The configured cookies file is re-validated at most this often
+    CONFIGURED_COOKIE_CHECK_TTL = 60
+
+    def __init__(self):
+        super().__init__()
+        self._cookie_cache: Dict[str, Tuple[float, Path]] = {}
+        # Generated cookie file -> requests currently using it; files are deleted only once unused
+        self._cookie_users: Dict[Path, int] = {}
+        self._cookie_lock: Optional[asyncio.Lock] = None
+        self._configured_cookie_check: Optional[Tuple[float, Optional[Path]]] = None
+    
+    async def get_video_info(self, url: str, lightweight: bool = False) -> Dict[str, Any]:
+        """Get TikTok video metadata (there is no cheaper path, so ``lightweight`` is ignored)"""
+        cached = metadata_cache.get(url)
+        if cached is not None:
+            return cached
 
-        def extract_info():
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                return ydl.extract_info(url, download=False)
+        # Most public videos resolve anonymously, so only prefetch session cookies when blocked
+        cookie_file, generated_cookie = await self._resolve_cookie_file(url, allow_generated=False)
 
         try:
-            info = await loop.run_in_executor(None, extract_info)
+            try:
+                info = await self._extract_info(url, cookie_file)
+            except Exception as e:
+                if cookie_file is not None or not any(marker in str(e) for marker in _COOKIE_REQUIRED_MARKERS):
+                    raise
+                cookie_file = await self._get_generated_cookie_file(url)
+                if cookie_file is None:
+                    raise
+                generated_cookie = True
+                logger.info("Retrying TikTok info extraction with generated session cookies")
+                info = await self._extract_info(url, cookie_file)
 
-            return {
+            metadata = {
                 'title': info.get('description', info.get('title', 'TikTok Video')),
                 'duration': info.get('duration', 0),
                 'thumbnail': info.get('thumbnail', ''),
@@ -47,6 +118,8 @@ class TikTokDownloader(BaseDownloader):
                 'formats': self._get_available_formats(info),
                 'platform': 'tiktok'
             }
+            metadata_cache.set(url, metadata)
+            return metadata
         except Exception as e:
             message = str(e)
             if 'Unable to extract webpage video data' in message:
@@ -58,7 +131,8 @@ class TikTokDownloader(BaseDownloader):
                         'platform': 'tiktok'
                     })
                     raise Exception("Could not fetch TikTok video info: TikTok requires cookies for downloading. Please add TikTok cookies to continue.")
-                elif cleanup_cookie:
+                elif generated_cookie:
+                    self._invalidate_cookie_cache(url)
                     self.emit_progress({
                         'status': 'cookie_error',
                         'message': 'TikTok cookies are invalid or expired. Please refresh your cookies to continue downloading.',
@@ -68,25 +142,35 @@ class TikTokDownloader(BaseDownloader):
                     raise Exception("Could not fetch TikTok video info: TikTok cookies are invalid or expired. Please refresh your cookies.")
             raise Exception(f"Could not fetch TikTok video info: {message}")
         finally:
-            if cleanup_cookie and cookie_file and cookie_file.exists():
-                asyncio.create_task(self.cleanup_file(cookie_file, delay=30))
+            if generated_cookie:
+                self._release_cookie_file(cookie_file)
     
+    async def _extract_info(self, url: str, cookie_file: Optional[Path]) -> Dict[str, Any]:
+        """Run metadata extraction in the extraction process pool"""
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': False,
+            'http_headers': _IOS_HEADERS,
+        }
+
+        if cookie_file:
+            ydl_opts['cookiefile'] = str(cookie_file)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_extract_pool(), extract_info_remote, url, ydl_opts)
+
     async def download(self, url: str, format_id: str = 'best',
                        start_time: Optional[float] = None, 
                        end_time: Optional[float] = None) -> Path:
-        """Download TikTok video"""
-        
-        temp_file = self.create_temp_file()
-        temp_file.close()
-        output_path = Path(temp_file.name)
+        """Download TikTok video, fetching only the requested section when trimming"""
+        output_path = self.create_temp_path()
 
-        if output_path.exists():
-            try:
-                output_path.unlink()
-            except OSError:
-                pass
+        cookie_file, generated_cookie = await self._resolve_cookie_file(url)
 
-        cookie_file, cleanup_cookie = await self._resolve_cookie_file(url)
+        # Size chunks and fragment concurrency from recent throughput; the setting stays the ceiling
+        chunk_size, fragments = bw_estimator.recommend(_BANDWIDTH_HOST)
+        fragments = min(fragments, settings.TIKTOK_CONCURRENT_FRAGMENTS)
 
         ydl_opts = {
             'format': format_id,
@@ -99,19 +183,37 @@ class TikTokDownloader(BaseDownloader):
             'fragment_retries': 5,
             'file_access_retries': 5,
             'extractor_retries': 3,
-            'sleep_interval': 2,
-            'sleep_interval_requests': 2,
+            'sleep_interval': 0,
+            'sleep_interval_requests': 0,
+            'concurrent_fragment_downloads': fragments,
+            # Buffered 64 KiB writes instead of yt-dlp's small default blocks
+            'buffersize': 65536,
             'timeout': 60,
             'socket_timeout': 60,
             'merge_output_format': 'mp4',
             'prefer_ffmpeg': True,
         }
 
+        # TikTok videos are mostly single progressive files; sub-MiB ranges would split one GET
+        # into dozens of sequential requests, so only chunk once the estimate calls for big chunks
+        if chunk_size >= _MIN_HTTP_CHUNK_SIZE:
+            ydl_opts['http_chunk_size'] = chunk_size
+
         if cookie_file:
             ydl_opts['cookiefile'] = str(cookie_file)
 
-        loop = asyncio.get_event_loop()
-        
+        if start_time is not None or end_time is not None:
+            # Let yt-dlp's ffmpeg downloader fetch just the span instead of trimming afterwards
+            ydl_opts['download_ranges'] = self._section_download_ranges(start_time, end_time)
+        elif _ARIA2C_PATH:
+            # Multi-connection range GETs for full downloads; section downloads need ffmpeg
+            ydl_opts['external_downloader'] = {'default': 'aria2c'}
+            ydl_opts['external_downloader_args'] = {'aria2c': _ARIA2C_ARGS}
+        else:
+            # Only yt-dlp's own full downloads are sampled; ffmpeg sections and aria2c's
+            # connection count would skew the per-connection estimate
+            ydl_opts['progress_hooks'] = [bw_estimator.progress_hook(_BANDWIDTH_HOST, fragments)]
+
         # Use the robust download method with retry mechanism
         try:
             downloaded_file = await self.verify_and_retry_download(
@@ -120,28 +222,10 @@ class TikTokDownloader(BaseDownloader):
                 max_retries=3,
                 apply_common_opts=False
             )
-            
-            if start_time is not None or end_time is not None:
-                # Trim video if needed
-                processor = VideoProcessor()
-                trimmed_path = await processor.trim_video(
-                    downloaded_file, 
-                    output_path,
-                    start_time, 
-                    end_time
-                )
-                
-                # Clean up original file
-                asyncio.create_task(self.cleanup_file(downloaded_file, delay=1))
-                
-                return trimmed_path
-            else:
-                # Return the downloaded file directly
-                return downloaded_file
-                
         except Exception as e:
             message = str(e)
             logger.error(f"TikTok download failed after all retries: {message}")
+            metadata_cache.invalidate(url)
 
             if 'Unable to extract webpage video data' in message:
                 if cookie_file is None:
@@ -155,7 +239,8 @@ class TikTokDownloader(BaseDownloader):
                         "TikTok now blocks anonymous downloads. Export your browser cookies "
                         "and set TIKTOK_COOKIES_FILE in the environment before retrying."
                     )
-                if cleanup_cookie:
+                if generated_cookie:
+                    self._invalidate_cookie_cache(url)
                     self.emit_progress({
                         'status': 'cookie_error',
                         'message': 'TikTok cookies are invalid or expired. Please refresh your cookies to continue downloading.',
@@ -169,45 +254,29 @@ class TikTokDownloader(BaseDownloader):
                     )
 
             raise
-
         finally:
-            if cleanup_cookie and cookie_file and cookie_file.exists():
-                asyncio.create_task(self.cleanup_file(cookie_file, delay=30))
+            if generated_cookie:
+                self._release_cookie_file(cookie_file)
+
+        return downloaded_file
 
     def _get_available_formats(self, info: Dict) -> list:
         """Extract available formats"""
-        formats = []
-        
+        safe_int = self._safe_int
+
         # TikTok usually has limited format options
-        for f in info.get('formats', []):
-            if f.get('vcodec') != 'none':
-                resolution = f.get('resolution') or f"{f.get('width', '?')}x{f.get('height', '?')}"
-                
-                # Safely get quality - ensure it's numeric
-                quality = f.get('quality')
-                if quality is None:
-                    quality = f.get('height', 0)
-                
-                # Convert to int if it's a string, or use 0 as fallback
-                try:
-                    quality = int(quality) if quality is not None else 0
-                except (ValueError, TypeError):
-                    quality = 0
-                
-                # Safely get filesize
-                filesize = f.get('filesize', 0)
-                try:
-                    filesize = int(filesize) if filesize is not None else 0
-                except (ValueError, TypeError):
-                    filesize = 0
-                
-                formats.append({
-                    'format_id': f['format_id'],
-                    'ext': f.get('ext', 'mp4'),
-                    'resolution': resolution,
-                    'filesize': filesize,
-                    'quality': quality
-                })
+        formats = [
+            {
+                'format_id': f['format_id'],
+                'ext': f.get('ext', 'mp4'),
+                'resolution': f.get('resolution') or f"{f.get('width', '?')}x{f.get('height', '?')}",
+                'filesize': safe_int(f.get('filesize')),
+                # Fall back to height when quality is missing
+                'quality': safe_int(f['quality'] if f.get('quality') is not None else f.get('height', 0)),
+            }
+            for f in info.get('formats', ())
+            if f.get('vcodec') != 'none'
+        ]
         
         # If no formats found, provide default
         if not formats:
@@ -219,83 +288,176 @@ class TikTokDownloader(BaseDownloader):
                 'quality': 1080
             }]
         
-        # Sort by quality (numeric) safely
-        return sorted(formats, key=lambda x: int(x.get('quality', 0)), reverse=True)
+        # Quality is already an int, so sort on it directly
+        return sorted(formats, key=itemgetter('quality'), reverse=True)
+
+    async def _resolve_cookie_file(self, url: str, allow_generated: bool = True) -> Tuple[Optional[Path], bool]:
+        """Return a cookie file path and whether it was generated rather than configured."""
 
-    async def _resolve_cookie_file(self, url: str) -> Tuple[Optional[Path], bool]:
-        """Return a cookie file path and whether it should be cleaned up afterwards."""
+        configured = self._get_configured_cookie_file()
+        if configured:
+            return configured, False
+
+        if not allow_generated:
+            return None, False
+
+        generated = await self._get_generated_cookie_file(url)
+        return generated, generated is not None
 
+    def _get_configured_cookie_file(self) -> Optional[Path]:
+        """Return the configured cookies file if usable, re-checking it at most once per TTL"""
+        now = time.monotonic()
+        if self._configured_cookie_check and now - self._configured_cookie_check[0] < self.CONFIGURED_COOKIE_CHECK_TTL:
+            return self._configured_cookie_check[1]
+
+        result = None
         configured = settings.TIKTOK_COOKIES_FILE
         if configured and configured.exists():
             try:
                 size = configured.stat().st_size
                 if size > 0:
                     logger.info(f"Using configured TikTok cookies file: {configured} (size: {size} bytes)")
-                    return configured, False
-                logger.warning(f"Configured TikTok cookies file is empty: {configured}")
+                    result = configured
+                else:
+                    logger.warning(f"Configured TikTok cookies file is empty: {configured}")
             except Exception as exc:
                 logger.warning(f"Failed to validate configured TikTok cookies file {configured}: {exc}")
 
-        generated = await self._prepare_cookie_file(url)
-        return generated, generated is not None
+        self._configured_cookie_check = (now, result)
+        return result
+
+    async def _get_generated_cookie_file(self, url: str) -> Optional[Path]:
+        """Return a recently generated cookie file for the URL's host, refreshing it when stale."""
+
+        host = urlsplit(url).hostname or 'www.tiktok.com'
+        if self._cookie_lock is None:
+            self._cookie_lock = asyncio.Lock()
+
+        async with self._cookie_lock:
+            cached = self._cookie_cache.get(host)
+            if cached:
+                created_at, cookie_path = cached
+                if time.monotonic() - created_at < self.COOKIE_CACHE_TTL and cookie_path.exists():
+                    self._retain_cookie_file(cookie_path)
+                    return cookie_path
+                del self._cookie_cache[host]
+                self._discard_cookie_file(cookie_path)
+
+            cookie_path = await self._prepare_cookie_file(url)
+            if cookie_path:
+                self._cookie_cache[host] = (time.monotonic(), cookie_path)
+                self._retain_cookie_file(cookie_path)
+            return cookie_path
+
+    def _retain_cookie_file(self, cookie_path: Path):
+        self._cookie_users[cookie_path] = self._cookie_users.get(cookie_path, 0) + 1
+
+    def _release_cookie_file(self, cookie_path: Path):
+        """Drop one user of a generated cookie file (callers of _get_generated_cookie_file must call this)
+
+        The last user deletes the file once it has left the cache or its TTL has run out,
+        so it can never disappear under a download that is still retrying.
+        """
+        users = self._cookie_users.get(cookie_path, 0) - 1
+        if users > 0:
+            self._cookie_users[cookie_path] = users
+            return
+        self._cookie_users.pop(cookie_path, None)
+
+        for host, (created_at, cached_path) in self._cookie_cache.items():
+            if cached_path == cookie_path:
+                if time.monotonic() - created_at < self.COOKIE_CACHE_TTL:
+                    return
+                del self._cookie_cache[host]
+                break
+        self._discard_cookie_file(cookie_path)
+
+    def _discard_cookie_file(self, cookie_path: Path):
+        """Delete a generated cookie file that left the cache, unless a request still holds it"""
+        if cookie_path not in self._cookie_users:
+            file_reaper.schedule(cookie_path, delay=0)
+
+    def reload_cookie_cache(self):
+        """Forget the cached configured cookies file check"""
+        self._configured_cookie_check = None
+
+    def _invalidate_cookie_cache(self, url: str):
+        """Forget the generated cookie file for the URL's host after TikTok rejected it"""
+        cached = self._cookie_cache.pop(urlsplit(url).hostname or 'www.tiktok.com', None)
+        if cached:
+            self._discard_cookie_file(cached[1])
+
+    def _write_cookie_file(self, contents: bytes) -> Path:
+        """Write Netscape cookie contents to a new owner-only temp file and return its path"""
+        cookie_path = self.create_temp_path(suffix='.cookies.txt')
+        fd = os.open(cookie_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            view = memoryview(contents)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+        finally:
+            os.close(fd)
+        return cookie_path
 
     async def _prepare_cookie_file(self, url: str) -> Optional[Path]:
         """Fetch TikTok page to obtain fresh cookies, storing them in Netscape format."""
 
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 16_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Referer': 'https://www.tiktok.com/',
-        }
-
         try:
-            timeout = httpx.Timeout(10.0, connect=5.0)
-            async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-                for endpoint in ["https://www.tiktok.com/", url]:
+            client = _get_cookie_client()
+            endpoints = ["https://www.tiktok.com/", url]
+            responses = await asyncio.gather(
+                *(client.get(endpoint, headers=_PREFETCH_HEADERS) for endpoint in endpoints),
+                return_exceptions=True
+            )
+
+            jar = httpx.Cookies()
+            for endpoint, response in zip(endpoints, responses):
+                if isinstance(response, Exception):
+                    logger.debug(f"TikTok cookie prefetch failed for {endpoint}: {response}")
+                    continue
+
+                for hop in (*response.history, response):
+                    jar.extract_cookies(hop)
+
+            # Format every cookie in a single pass over the jar
+            buf = bytearray(_COOKIE_FILE_HEADER)
+            field_names = []
+            for cookie in jar.jar:
+                if not cookie.value:
+                    continue
+
+                domain = cookie.domain or '.tiktok.com'
+                dotted = domain.startswith('.')
+                subdomains = dotted or cookie.domain_initial_dot
+                include_subdomains = 'TRUE' if subdomains else 'FALSE'
+                if subdomains and not dotted:
+                    domain = f".{domain}"
+
+                path = cookie.path or '/'
+                secure = 'TRUE' if cookie.secure else 'FALSE'
+
+                if cookie.expires:
                     try:
-                        await client.get(endpoint, headers=headers)
-                    except Exception as exc:
-                        logger.debug(f"TikTok cookie prefetch failed for {endpoint}: {exc}")
-                        continue
-
-                cookie_items = [cookie for cookie in client.cookies.jar if cookie.value]
-
-                if not cookie_items:
-                    return None
-
-                temp_cookie = tempfile.NamedTemporaryFile(delete=False, suffix='.cookies.txt', dir=self.temp_dir)
-                temp_cookie.close()
-                cookie_path = Path(temp_cookie.name)
-
-                with cookie_path.open('w', encoding='utf-8') as fh:
-                    fh.write('# Netscape HTTP Cookie File\n')
-                    fh.write('# This file was generated by the TikTok downloader\n\n')
-
-                    for cookie in cookie_items:
-                        domain = cookie.domain or '.tiktok.com'
-                        include_subdomains = 'TRUE' if getattr(cookie, 'domain_initial_dot', False) or domain.startswith('.') else 'FALSE'
-                        if include_subdomains == 'TRUE' and not domain.startswith('.'):
-                            domain = f".{domain}"
-
-                        path = cookie.path or '/'
-                        secure = 'TRUE' if cookie.secure else 'FALSE'
-
-                        if cookie.expires:
-                            try:
-                                expires = str(int(cookie.expires))
-                            except (TypeError, ValueError):
-                                expires = '0'
-                        else:
-                            expires = '0'
-
-                        name = cookie.name
-                        value = cookie.value
-                        fh.write(f"{domain}\t{include_subdomains}\t{path}\t{secure}\t{expires}\t{name}\t{value}\n")
-
-                field_names = [cookie.name for cookie in cookie_items]
+                        expires = str(int(cookie.expires))
+                    except (TypeError, ValueError):
+                        expires = '0'
+                else:
+                    expires = '0'
+
+                buf += '\t'.join((domain, include_subdomains, path, secure, expires, cookie.name, cookie.value)).encode('utf-8')
+                buf += b'\n'
+                field_names.append(cookie.name)
+
+            if not field_names:
+                return None
+
+            # Create and write the file off the event loop
+            cookie_path = await asyncio.to_thread(self._write_cookie_file, bytes(buf))
+
+            if logger.isEnabledFor(logging.DEBUG):
                 logger.debug(f"Prepared TikTok cookie file at {cookie_path} with fields: {field_names}")
-                return cookie_path
+            return cookie_path
 
         except Exception as exc:
             logger.debug(f"TikTok cookie file preparation failed: {exc}")
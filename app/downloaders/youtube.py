@@ -1,18 +1,75 @@
 import yt_dlp
 import asyncio
+import copy
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from operator import itemgetter
+from typing import Optional, Dict, Any, List, Tuple
 import random
+import time
 
 from .base import BaseDownloader
 from ..utils.video_processor import VideoProcessor
 from ..config import settings
 from ..utils.logger import logger
+from ..utils.file_reaper import file_reaper
+from ..utils.executors import get_download_executor
+from ..utils.metadata_cache import canonical_url, metadata_cache
+from ..utils.ydl_pool import ydl_pool
+
+# Shared by every config; each config copies them before adding its User-Agent
+_BASE_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Cache-Control': 'max-age=0',
+}
+
+_EXTRACTOR_FALLBACK = {
+    'extractor_args': {
+        'youtube': {
+            'player_client': ['android', 'ios'],
+        }
+    }
+}
+
+# Metadata-only extraction: skip the player JS (signature and n-parameter decryption) and the DASH/HLS manifests
+_LIGHTWEIGHT_YOUTUBE_ARGS = {
+    'player_skip': ['js'],
+    'skip': ['dash', 'hls'],
+}
+
+
+def _lightweight_info_opts(opts: Dict[str, Any]) -> Dict[str, Any]:
+    extractor_args = opts.get('extractor_args', {})
+    return {
+        **opts,
+        # Skipping the player JS drops every format that needs a signature or n challenge,
+        # which can be all of them; metadata is still complete, so don't treat that as a failure
+        'ignore_no_formats_error': True,
+        'extractor_args': {
+            **extractor_args,
+            'youtube': {**extractor_args.get('youtube', {}), **_LIGHTWEIGHT_YOUTUBE_ARGS},
+        },
+    }
+
+# Info fields that download() never needs when replaying a cached extraction
+_REPLAY_UNUSED_FIELDS = frozenset({'automatic_captions', 'subtitles', 'heatmap'})
 
 class YouTubeDownloader(BaseDownloader):
+    # Stream URLs stay valid for hours; this only needs to cover the gap between info and download
+    INFO_CACHE_TTL = 300
+    # Each entry holds every format with its headers, so keep only the most recent few
+    INFO_CACHE_MAXSIZE = 32
     
     def __init__(self):
         super().__init__()
+        # canonical URL -> (stored at, (config index, cookiefile), sanitized info dict)
+        self._info_cache: "OrderedDict[str, Tuple[float, Tuple[int, Optional[str]], Dict[str, Any]]]" = OrderedDict()
+        # Excess downloads queue here instead of piling onto the shared yt-dlp thread pool
+        self._download_slots = asyncio.Semaphore(settings.MAX_CONCURRENT_DOWNLOADS)
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
@@ -23,8 +80,6 @@ class YouTubeDownloader(BaseDownloader):
 
     def _locate_cookie_file(self) -> Optional[Path]:
         """Try to locate a usable YouTube cookies file"""
-        import time
-        
         module_dir = Path(__file__).resolve().parent
         project_root = module_dir.parent.parent
 
@@ -104,16 +159,6 @@ class YouTubeDownloader(BaseDownloader):
     
     def _get_ydl_configs(self, cookie_path: Optional[Path], *, for_info: bool = False) -> List[Dict[str, Any]]:
         """Generate multiple yt-dlp configurations to try"""
-        base_headers = {
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0',
-        }
-
         common_opts: Dict[str, Any] = {
             'quiet': True,
             'no_warnings': True,
@@ -124,28 +169,22 @@ class YouTubeDownloader(BaseDownloader):
             'retries': 3,
             'extractor_retries': 2,
             'file_access_retries': 2,
-            'fragment_retries': 2,
-            'concurrent_fragment_downloads': 1,
+            'fragment_retries': 3,
+            'concurrent_fragment_downloads': settings.YOUTUBE_CONCURRENT_FRAGMENTS,
+            # Ranged requests keep YouTube from throttling a single long-lived connection
+            'http_chunk_size': 10485760,
             'noprogress': True,
             'cachedir': False,
         }
 
-        extractor_fallback = {
-            'extractor_args': {
-                'youtube': {
-                    'player_client': ['android', 'ios'],
-                }
-            }
-        }
-
         def build_config(format_string: str, user_agent: str, extra: Optional[Dict[str, Any]] = None,
                          *, include_fallback_args: bool = True, set_headers: bool = True) -> Dict[str, Any]:
             cfg = dict(common_opts)
             if include_fallback_args:
-                cfg.update(extractor_fallback)
+                cfg.update(_EXTRACTOR_FALLBACK)
 
             if set_headers:
-                headers = {**base_headers, 'User-Agent': user_agent}
+                headers = {**_BASE_HEADERS, 'User-Agent': user_agent}
                 cfg.update({
                     'user_agent': user_agent,
                     'http_headers': headers,
@@ -182,7 +221,7 @@ class YouTubeDownloader(BaseDownloader):
             # Use a stable desktop UA that matches typical cookie exports
             cookie_user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36'
             cookie_cfg['user_agent'] = cookie_user_agent
-            cookie_cfg['http_headers'] = {**base_headers, 'User-Agent': cookie_user_agent}
+            cookie_cfg['http_headers'] = {**_BASE_HEADERS, 'User-Agent': cookie_user_agent}
             configs.append(cookie_cfg)
             
             # Fallback cookie configuration with different format selection
@@ -199,12 +238,16 @@ class YouTubeDownloader(BaseDownloader):
                 'sleep_interval': 2,
             })
             cookie_cfg2['user_agent'] = cookie_user_agent
-            cookie_cfg2['http_headers'] = {**base_headers, 'User-Agent': cookie_user_agent}
+            cookie_cfg2['http_headers'] = {**_BASE_HEADERS, 'User-Agent': cookie_user_agent}
             configs.append(cookie_cfg2)
 
-        configs.append(build_config('best', random.choice(self.user_agents)))
+        # Info configs are the ydl_pool key, so they keep a fixed UA per slot; a random one would never match again
+        def pick_user_agent(slot: int) -> str:
+            return self.user_agents[slot] if for_info else random.choice(self.user_agents)
+
+        configs.append(build_config('best', pick_user_agent(0)))
 
-        configs.append(build_config('best[height<=720]/best', random.choice(self.user_agents), {
+        configs.append(build_config('best[height<=720]/best', pick_user_agent(1), {
             'sleep_interval_requests': 2,
             'sleep_interval': 2,
         }))
@@ -217,8 +260,18 @@ class YouTubeDownloader(BaseDownloader):
 
         return configs
     
-    async def get_video_info(self, url: str) -> Dict[str, Any]:
-        """Get YouTube video metadata with multiple fallback strategies"""
+    async def get_video_info(self, url: str, lightweight: bool = False) -> Dict[str, Any]:
+        """Get YouTube video metadata with multiple fallback strategies
+
+        ``lightweight`` skips the player JS and streaming manifests, which is enough for
+        title, duration and thumbnail previews; the format list may then be incomplete.
+        """
+        cached = metadata_cache.get(url)
+        if cached is None and lightweight:
+            cached = metadata_cache.get(url, variant='lightweight')
+        if cached is not None:
+            return cached
+
         self.emit_progress({
             'status': 'info',
             'message': 'Fetching video information...',
@@ -234,6 +287,8 @@ class YouTubeDownloader(BaseDownloader):
             })
 
         configs = self._get_ydl_configs(cookie_path, for_info=True)
+        if lightweight:
+            configs = [_lightweight_info_opts(opts) for opts in configs]
         config_count = len(configs)
         last_error = None
         
@@ -259,13 +314,15 @@ class YouTubeDownloader(BaseDownloader):
                     'progress': progress_value
                 })
                 
-                loop = asyncio.get_event_loop()
+                loop = asyncio.get_running_loop()
                 
                 def extract_info():
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        return ydl.extract_info(url, download=False)
+                    with ydl_pool.acquire(ydl_opts) as ydl:
+                        info = ydl.extract_info(url, download=False)
+                        # Plain data, so download() can replay it through process_ie_result later
+                        return info if lightweight else ydl.sanitize_info(info)
                 
-                info = await loop.run_in_executor(None, extract_info)
+                info = await loop.run_in_executor(get_download_executor(), extract_info)
                 
                 self.emit_progress({
                     'status': 'info_complete',
@@ -273,13 +330,17 @@ class YouTubeDownloader(BaseDownloader):
                     'progress': 100
                 })
                 
-                return {
+                metadata = {
                     'title': info.get('title', 'Unknown'),
                     'duration': info.get('duration', 0),
                     'thumbnail': info.get('thumbnail', ''),
                     'formats': self._get_available_formats(info),
                     'platform': 'youtube'
                 }
+                metadata_cache.set(url, metadata, variant='lightweight' if lightweight else '')
+                if not lightweight:
+                    self._store_info(url, (i, ydl_opts.get('cookiefile')), info)
+                return metadata
                 
             except Exception as e:
                 last_error = e
@@ -351,49 +412,97 @@ class YouTubeDownloader(BaseDownloader):
                        start_time: Optional[float] = None, 
                        end_time: Optional[float] = None) -> Path:
         """Download YouTube video with progress tracking"""
-        
-        self.emit_progress({
-            'status': 'preparing',
-            'message': 'Preparing download...',
-            'progress': 0
-        })
-        
-        # Create unique temp file
-        temp_file = self.create_temp_file()
-        output_path = Path(temp_file.name)
-        
-        # Progress hook function
-        def progress_hook(d):
+        loop = asyncio.get_running_loop()
+        progress_queue: asyncio.Queue = asyncio.Queue(maxsize=64)
+        drain_task = loop.create_task(self._drain_progress(progress_queue))
+        try:
+            return await self._download(url, format_id, start_time, end_time,
+                                        self._progress_hook(loop, progress_queue), progress_queue)
+        finally:
+            drain_task.cancel()
+            self._flush_progress(progress_queue)
+
+    async def _drain_progress(self, progress_queue: asyncio.Queue):
+        """Emit queued progress updates from the event loop"""
+        while True:
+            self.emit_progress(await progress_queue.get())
+
+    def _flush_progress(self, progress_queue: asyncio.Queue):
+        """Emit everything still queued, in order"""
+        while not progress_queue.empty():
+            self.emit_progress(progress_queue.get_nowait())
+
+    def _progress_hook(self, loop: asyncio.AbstractEventLoop, progress_queue: asyncio.Queue):
+        """Build a yt-dlp progress hook that hands updates to the event loop instead of emitting them itself
+
+        Download updates are coalesced to one per percent or per 250 ms, and the
+        oldest queued update is dropped when the consumer falls behind.
+        """
+        last_percent = -1.0
+        last_emit = 0.0
+
+        def post(payload: Dict[str, Any]):
+            if progress_queue.full():
+                progress_queue.get_nowait()
+            progress_queue.put_nowait(payload)
+
+        def hook(d):
+            nonlocal last_percent, last_emit
             if d['status'] == 'downloading':
-                percent_str = d.get('_percent_str', '0%')
-                speed_str = d.get('_speed_str', 'N/A')
-                eta_str = d.get('_eta_str', 'N/A')
-                
-                # Parse percentage
-                try:
-                    percent = float(percent_str.replace('%', ''))
-                except:
-                    percent = 0
-                
-                self.emit_progress({
+                # Work from the raw byte counts rather than re-parsing yt-dlp's display strings
+                downloaded = d.get('downloaded_bytes') or 0
+                exact_total = d.get('total_bytes')
+                total = exact_total or d.get('total_bytes_estimate')
+                # Estimates can undershoot, so clamp instead of reporting more than 100%
+                percent = min(downloaded * 100.0 / total, 100.0) if total else 0.0
+
+                now = time.monotonic()
+                # Never coalesce away the final tick, which only a known exact size can identify
+                final = bool(exact_total) and downloaded >= exact_total
+                if not final and percent - last_percent < 1 and now - last_emit < 0.25:
+                    return
+                last_percent, last_emit = percent, now
+
+                payload = {
                     'status': 'downloading',
                     'progress': percent,
-                    'speed': speed_str,
-                    'eta': eta_str,
-                    'message': f'Downloading... {percent_str}'
-                })
+                    'speed': d.get('_speed_str', 'N/A'),
+                    'eta': d.get('_eta_str', 'N/A'),
+                    'message': f'Downloading... {percent:.1f}%'
+                }
             elif d['status'] == 'finished':
-                self.emit_progress({
+                payload = {
                     'status': 'finished',
                     'progress': 100,
                     'message': 'Download complete'
-                })
+                }
             elif d['status'] == 'error':
-                self.emit_progress({
+                payload = {
                     'status': 'error',
                     'progress': 0,
                     'message': f'Download error: {d.get("error", "Unknown error")}'
-                })
+                }
+            else:
+                return
+
+            try:
+                loop.call_soon_threadsafe(post, payload)
+            except RuntimeError:
+                # The loop is gone (shutdown); nobody is listening anymore
+                pass
+
+        return hook
+
+    async def _download(self, url: str, format_id: str, start_time: Optional[float],
+                        end_time: Optional[float], progress_hook, progress_queue: asyncio.Queue) -> Path:
+        self.emit_progress({
+            'status': 'preparing',
+            'message': 'Preparing download...',
+            'progress': 0
+        })
+        
+        # Unique temp path; yt-dlp (or the trimmer) creates the file itself
+        output_path = self.create_temp_path()
         
         # Use multiple configurations for download as well
         cookie_path = self._locate_cookie_file()
@@ -407,8 +516,15 @@ class YouTubeDownloader(BaseDownloader):
         configs = self._get_ydl_configs(cookie_path)
         config_count = len(configs)
         last_error = None
+        outtmpl = str(output_path.parent / f"{output_path.stem}.%(ext)s")
+        cached_info = self._get_cached_info(url)
 
         for i, base_opts in enumerate(configs):
+            # Reuse the info from get_video_info with the matching config instead of extracting again
+            ie_result = None
+            if cached_info is not None and cached_info[0] == (i, base_opts.get('cookiefile')):
+                ie_result = cached_info[1]
+
             try:
                 if 'cookiefile' in base_opts:
                     if i == 0:
@@ -433,7 +549,7 @@ class YouTubeDownloader(BaseDownloader):
                 ydl_opts = {
                     **base_opts,
                     'format': self._get_format_string(format_id),
-                    'outtmpl': str(output_path.parent / f"{output_path.stem}.%(ext)s"),
+                    'outtmpl': outtmpl,
                     'no_playlist': True,
                     'progress_hooks': [progress_hook],
                     'postprocessors': [{
@@ -451,10 +567,11 @@ class YouTubeDownloader(BaseDownloader):
                     })
                     
                     # Download full video first
-                    temp_full = self.create_temp_file()
-                    ydl_opts['outtmpl'] = str(Path(temp_full.name).parent / f"{Path(temp_full.name).stem}.%(ext)s")
+                    temp_full_path = self.create_temp_path()
+                    temp_parent, temp_stem = temp_full_path.parent, temp_full_path.stem
+                    ydl_opts['outtmpl'] = str(temp_parent / f"{temp_stem}.%(ext)s")
                     
-                    loop = asyncio.get_event_loop()
+                    loop = asyncio.get_running_loop()
                     
                     def download_video():
                         try:
@@ -467,46 +584,38 @@ class YouTubeDownloader(BaseDownloader):
                                         logger.info(f"Download finished: {d.get('filename')}")
                                 
                                 ydl_opts['progress_hooks'] = [debug_hook]
-                                ydl.download([url])
+                                if ie_result is not None:
+                                    info = ydl.process_ie_result(copy.deepcopy(ie_result), download=True)
+                                else:
+                                    info = ydl.extract_info(url, download=True)
+                                
+                                # yt-dlp reports the final (post-merge) path
+                                reported = self._reported_filepath(info)
+                                if self._file_size(reported) > 0:
+                                    return reported
                                 
                                 # Find the actual downloaded file (yt-dlp may add extension)
-                                stem = Path(temp_full.name).stem
-                                found_files = []
-                                for ext in ['.mp4', '.webm', '.mkv', '.mov']:
-                                    potential_file = Path(temp_full.name).parent / f"{stem}.{ext}"
-                                    if potential_file.exists():
-                                        found_files.append(potential_file)
-                                        # Verify file has content
-                                        file_size = potential_file.stat().st_size
-                                        logger.info(f"Found downloaded file: {potential_file}, size: {file_size} bytes")
-                                        if file_size > 0:
-                                            return potential_file
-                                        else:
-                                            logger.warning(f"Downloaded file is empty: {potential_file}")
+                                found_files = self._find_output_files(temp_parent, temp_stem)
+                                for potential_file, file_size in found_files:
+                                    logger.info(f"Found downloaded file: {potential_file}, size: {file_size} bytes")
+                                    if file_size > 0:
+                                        return potential_file
+                                    logger.warning(f"Downloaded file is empty: {potential_file}")
                                 
                                 # If no file found or all are empty, log detailed information
-                                logger.warning(f"No valid downloaded file found for stem: {stem}")
-                                logger.warning(f"Files found: {found_files}")
-                                
-                                # List all files in the directory for debugging
-                                temp_dir = Path(temp_full.name).parent
-                                all_files = list(temp_dir.glob("*"))
-                                logger.warning(f"All files in temp directory: {all_files}")
-                                
-                                # Check if there are any recent files that might be the download
-                                for file in all_files:
-                                    if file.is_file() and stem in file.name:
-                                        file_size = file.stat().st_size
-                                        logger.warning(f"Potential match: {file}, size: {file_size} bytes")
-                                        if file_size > 0:
-                                            return file
+                                logger.warning(f"No valid downloaded file found for stem: {temp_stem}")
+                                logger.warning(f"Files found: {[path for path, _ in found_files]}")
                                 
-                                return Path(temp_full.name)
+                                return temp_full_path
                         except Exception as e:
                             logger.error(f"Download failed with exception: {str(e)}")
                             raise
                     
-                    downloaded_file = await loop.run_in_executor(None, download_video)
+                    async with self._download_slots:
+                        downloaded_file = await loop.run_in_executor(get_download_executor(), download_video)
+                    # The thread's last posts (including 'finished') land before its result; emit them
+                    # before this method reports anything else
+                    self._flush_progress(progress_queue)
                     
                     # Trim the video
                     self.emit_progress({
@@ -530,7 +639,7 @@ class YouTubeDownloader(BaseDownloader):
                     return trimmed_path
                 else:
                     # Direct download
-                    loop = asyncio.get_event_loop()
+                    loop = asyncio.get_running_loop()
                     
                     def download_video():
                         try:
@@ -543,68 +652,55 @@ class YouTubeDownloader(BaseDownloader):
                                         logger.info(f"Download finished: {d.get('filename')}")
                                 
                                 ydl_opts['progress_hooks'] = [debug_hook]
-                                ydl.download([url])
+                                if ie_result is not None:
+                                    info = ydl.process_ie_result(copy.deepcopy(ie_result), download=True)
+                                else:
+                                    info = ydl.extract_info(url, download=True)
                                 
-                                # Find the actual downloaded file
-                                stem = output_path.stem
-                                found_files = []
-                                for ext in ['.mp4', '.webm', '.mkv', '.mov']:
-                                    potential_file = output_path.parent / f"{stem}.{ext}"
-                                    if potential_file.exists():
-                                        found_files.append(potential_file)
-                                        # Verify file has content
-                                        file_size = potential_file.stat().st_size
-                                        logger.info(f"Found downloaded file: {potential_file}, size: {file_size} bytes")
-                                        if file_size > 0:
-                                            return potential_file
-                                        else:
-                                            logger.warning(f"Downloaded file is empty: {potential_file}")
+                                # yt-dlp reports the final (post-merge) path
+                                reported = self._reported_filepath(info)
+                                if self._file_size(reported) > 0:
+                                    return reported
                                 
-                                # If no valid file found, check the original output path
-                                if output_path.exists():
-                                    file_size = output_path.stat().st_size
-                                    logger.info(f"Original output file size: {file_size} bytes")
+                                # Find the actual downloaded file (includes the original output path)
+                                stem = output_path.stem
+                                found_files = self._find_output_files(output_path.parent, stem)
+                                for potential_file, file_size in found_files:
+                                    logger.info(f"Found downloaded file: {potential_file}, size: {file_size} bytes")
                                     if file_size > 0:
-                                        return output_path
-                                
-                                # List all files in the directory for debugging
-                                temp_dir = output_path.parent
-                                all_files = list(temp_dir.glob("*"))
-                                logger.warning(f"All files in temp directory: {all_files}")
-                                
-                                # Check if there are any recent files that might be the download
-                                for file in all_files:
-                                    if file.is_file() and stem in file.name:
-                                        file_size = file.stat().st_size
-                                        logger.warning(f"Potential match: {file}, size: {file_size} bytes")
-                                        if file_size > 0:
-                                            return file
+                                        return potential_file
+                                    logger.warning(f"Downloaded file is empty: {potential_file}")
                                 
                                 # Fallback
                                 logger.warning(f"No valid downloaded file found for stem: {stem}")
-                                logger.warning(f"Files found: {found_files}")
+                                logger.warning(f"Files found: {[path for path, _ in found_files]}")
                                 return output_path
                         except Exception as e:
                             logger.error(f"Download failed with exception: {str(e)}")
                             raise
                     
-                    downloaded_file = await loop.run_in_executor(None, download_video)
+                    async with self._download_slots:
+                        downloaded_file = await loop.run_in_executor(get_download_executor(), download_video)
+                    # The thread's last posts (including 'finished') land before its result; emit them
+                    # before this method reports anything else
+                    self._flush_progress(progress_queue)
                     
                     # Ensure MP4 compatibility for direct downloads
-                    if downloaded_file.exists() and downloaded_file.stat().st_size > 0:
+                    if self._file_size(downloaded_file) > 0:
                         mp4_compatible_path = output_path.parent / f"{output_path.stem}_compatible.mp4"
                         processor = VideoProcessor()
                         final_path = await processor.ensure_mp4_compatibility(downloaded_file, mp4_compatible_path)
                         
                         # Clean up original if different
                         if final_path != downloaded_file:
-                            asyncio.create_task(self.cleanup_file(downloaded_file, delay=1))
+                            file_reaper.schedule(downloaded_file, delay=1)
                         
                         return final_path
                     
                     return downloaded_file
                     
             except Exception as e:
+                self._flush_progress(progress_queue)
                 last_error = e
                 config_name = "Cookie Authentication" if i == 0 and 'cookiefile' in base_opts else f'Download Configuration {i+1}'
                 
@@ -645,6 +741,10 @@ class YouTubeDownloader(BaseDownloader):
                 if i < config_count - 1:
                     await asyncio.sleep(2)
         
+        # The cached formats may be what no longer downloads, so fetch them fresh next time
+        metadata_cache.invalidate(url)
+        self._info_cache.pop(canonical_url(url), None)
+
         # All configurations failed
         # Check if it's specifically a cookie failure
         cookie_failed = False
@@ -670,12 +770,33 @@ class YouTubeDownloader(BaseDownloader):
             })
         raise Exception(error_msg)
     
+    def reload_cookie_cache(self):
+        """Drop info extracted with the previous cookies; the file itself is located again on every call"""
+        self._info_cache.clear()
+
+    def _store_info(self, url: str, config_key: Tuple[int, Optional[str]], info: Dict[str, Any]):
+        # Captions and the heatmap are the bulk of the dict and play no part in a download replay
+        info = {k: v for k, v in info.items() if k not in _REPLAY_UNUSED_FIELDS}
+        key = canonical_url(url)
+        self._info_cache[key] = (time.monotonic(), config_key, info)
+        self._info_cache.move_to_end(key)
+        while len(self._info_cache) > self.INFO_CACHE_MAXSIZE:
+            self._info_cache.popitem(last=False)
+
+    def _get_cached_info(self, url: str) -> Optional[Tuple[Tuple[int, Optional[str]], Dict[str, Any]]]:
+        """Return ``(config_key, info)`` from a recent get_video_info call for ``url``"""
+        key = canonical_url(url)
+        hit = self._info_cache.get(key)
+        if hit is not None and time.monotonic() - hit[0] < self.INFO_CACHE_TTL:
+            return hit[1], hit[2]
+        if hit is not None:
+            del self._info_cache[key]
+        return None
+
     def _get_available_formats(self, info: Dict) -> list:
         """Extract available formats with better filtering"""
-        formats = []
-        
         # Add best format option
-        formats.append({
+        best_option = {
             'format_id': 'best',
             'ext': 'mp4',
             'resolution': 'Best Quality',
@@ -684,43 +805,37 @@ class YouTubeDownloader(BaseDownloader):
             'fps': None,
             'vcodec': 'best',
             'acodec': 'best'
-        })
-        
-        # Add specific formats
+        }
+
+        # Dedupe by height and container while collecting, keeping the higher quality entry.
+        # Each entry carries its sort key so sorting never calls back into Python.
+        unique_formats: Dict[str, tuple] = {}
         for f in info.get('formats', []):
             if f.get('vcodec') != 'none' and f.get('acodec') != 'none':
-                # Calculate file size if not available
-                filesize = f.get('filesize') or f.get('filesize_approx')
-                
-                formats.append({
+                height = f.get('height')
+                ext = f.get('ext', 'mp4')
+                quality = f.get('quality', 0)
+                key = f"{height}p_{ext}"
+                current = unique_formats.get(key)
+                if current is not None and quality <= current[1]['quality']:
+                    continue
+                unique_formats[key] = ((-(height or 0), -(quality or 0)), {
                     'format_id': f['format_id'],
-                    'ext': f.get('ext', 'mp4'),
+                    'ext': ext,
                     'resolution': f.get('resolution', f.get('format_note', 'Unknown')),
-                    'filesize': filesize,
-                    'quality': f.get('quality', 0),
+                    # Calculate file size if not available
+                    'filesize': f.get('filesize') or f.get('filesize_approx'),
+                    'quality': quality,
                     'fps': f.get('fps'),
                     'vcodec': f.get('vcodec'),
                     'acodec': f.get('acodec'),
-                    'height': f.get('height'),
+                    'height': height,
                     'width': f.get('width')
                 })
         
-        # Sort by quality (height preference) and filter duplicates
-        unique_formats = {}
-        for fmt in formats:
-            key = f"{fmt.get('height', 0)}p_{fmt.get('ext', 'mp4')}"
-            if key not in unique_formats or fmt.get('quality', 0) > unique_formats[key].get('quality', 0):
-                unique_formats[key] = fmt
-        
-        # Convert back to list and sort
-        sorted_formats = list(unique_formats.values())
-        sorted_formats.sort(key=lambda x: (
-            0 if x['format_id'] == 'best' else 1,  # Keep 'best' first
-            -(x.get('height', 0) or 0),  # Sort by height descending
-            -(x.get('quality', 0))  # Then by quality
-        ))
-        
-        return sorted_formats
+        # Sort by height, then quality; 'best' always comes first
+        ranked = sorted(unique_formats.values(), key=itemgetter(0))
+        return [best_option, *(fmt for _, fmt in ranked)]
     
     def _get_format_string(self, format_id: str) -> str:
         """Get yt-dlp format string from format ID"""
@@ -15,8 +15,11 @@ from .config import settings
 from .database.models import create_tables, get_db_session
 from .database.auth import DatabaseAuthManager
 from .downloaders import YouTubeDownloader, TikTokDownloader, FacebookDownloader, TwitterDownloader
+from .downloaders.tiktok import close_cookie_client
 from .utils.cleanup import TempFileCleanup
 from .utils.logger import logger
+from .utils.executors import shutdown_executors
+from .utils.file_reaper import file_reaper
 from .utils.video_converter import VideoConverter
 from .utils.download_scheduler import DownloadScheduler
 from .api.websocket import send_progress_update, send_download_complete, send_download_error, websocket_endpoint
@@ -86,6 +89,7 @@ async def startup_event():
     try:
         # Start cleanup service
         asyncio.create_task(cleanup_service.start())
+        file_reaper.start()
         
         # Initialize and start download scheduler
         global scheduler
@@ -111,6 +115,10 @@ async def shutdown_event():
         await scheduler.stop()
         logger.info("Download scheduler stopped")
 
+    await close_cookie_client()
+    await file_reaper.stop()
+    shutdown_executors()
+
 @app.get("/")
 async def root():
     """Redirect to login"""
@@ -233,6 +241,8 @@ async def get_video_info(
         data = await request.json()
         url = data.get('url')
         platform = data.get('platform')
+        # Previews only need title/duration/thumbnail; full extraction waits for the download
+        lightweight = str(data.get('lightweight', False)).lower() == 'true'
         
         if not url or not platform:
             raise HTTPException(status_code=400, detail="URL and platform required")
@@ -243,7 +253,7 @@ async def get_video_info(
         logger.info(f"User {current_user} requesting video info for {url} on {platform}")
         
         downloader = downloaders[platform]
-        info = await downloader.get_video_info(url)
+        info = await downloader.get_video_info(url, lightweight=lightweight)
         
         logger.info(f"Successfully retrieved video info for {url}")
         return info
@@ -358,19 +368,9 @@ async def download_video(
             finally:
                 # Delete file after streaming - delay to ensure client finishes download
                 try:
-                    if video_path and os.path.exists(video_path):
-                        # Schedule cleanup with a delay
-                        async def delayed_cleanup():
-                            await asyncio.sleep(60)  # Wait 60 seconds before cleanup
-                            try:
-                                if video_path and os.path.exists(video_path):
-                                    os.unlink(video_path)
-                                    logger.info(f"Cleaned up temporary file: {video_path}")
-                            except Exception as e:
-                                logger.warning(f"Failed to cleanup file {video_path}: {str(e)}")
-                        
-                        # Start cleanup task without awaiting
-                        asyncio.create_task(delayed_cleanup())
+                    if video_path:
+                        # Wait 60 seconds before cleanup
+                        file_reaper.schedule(video_path, delay=60)
                 except Exception as e:
                     logger.warning(f"Failed to schedule cleanup for {video_path}: {str(e)}")
         
@@ -412,21 +412,8 @@ async def download_video(
         logger.error(f"Unexpected error downloading video: {error_msg}")
         
         # Cleanup any temporary files - with delay to avoid race conditions
-        if video_path and os.path.exists(video_path):
-            try:
-                async def delayed_error_cleanup():
-                    await asyncio.sleep(5)  # Short delay for error cleanup
-                    try:
-                        if video_path and os.path.exists(video_path):
-                            os.unlink(video_path)
-                            logger.info(f"Cleaned up temporary file after error: {video_path}")
-                    except Exception as e:
-                        logger.warning(f"Failed to cleanup file after error {video_path}: {str(e)}")
-                
-                # Start cleanup task without awaiting
-                asyncio.create_task(delayed_error_cleanup())
-            except:
-                pass
+        if video_path:
+            file_reaper.schedule(video_path, delay=5)  # Short delay for error cleanup
         
         # Provide more user-friendly error messages
         if "Could not download" in error_msg and "after multiple attempts" in error_msg:
@@ -686,19 +673,10 @@ async def convert_video(
             finally:
                 # Delete files after streaming - delay to ensure client finishes download
                 try:
-                    async def delayed_cleanup():
-                        await asyncio.sleep(60)  # Wait 60 seconds before cleanup
-                        try:
-                            if video_path and video_path.exists():
-                                video_path.unlink()
-                            if result_path and result_path.exists():
-                                result_path.unlink()
-                            logger.info(f"Cleaned up conversion files")
-                        except Exception as e:
-                            logger.warning(f"Failed to cleanup conversion files: {str(e)}")
-                    
-                    # Start cleanup task without awaiting
-                    asyncio.create_task(delayed_cleanup())
+                    # Wait 60 seconds before cleanup
+                    for path in (video_path, result_path):
+                        if path:
+                            file_reaper.schedule(path, delay=60)
                 except Exception as e:
                     logger.warning(f"Failed to schedule conversion cleanup: {str(e)}")
         
@@ -731,23 +709,9 @@ async def convert_video(
         logger.error(f"Video conversion error: {str(e)}")
         
         # Cleanup any temporary files - with delay to avoid race conditions
-        for path in [video_path, converted_path]:
-            if path and path.exists():
-                try:
-                    async def delayed_conversion_error_cleanup():
-                        await asyncio.sleep(5)  # Short delay for error cleanup
-                        try:
-                            for p in [video_path, converted_path]:
-                                if p and p.exists():
-                                    p.unlink()
-                                    logger.info(f"Cleaned up conversion file after error: {p}")
-                        except Exception as e:
-                            logger.warning(f"Failed to cleanup conversion file after error: {str(e)}")
-                    
-                    # Start cleanup task without awaiting
-                    asyncio.create_task(delayed_conversion_error_cleanup())
-                except:
-                    pass
+        for path in (video_path, converted_path):
+            if path:
+                file_reaper.schedule(path, delay=5)  # Short delay for error cleanup
         
         raise HTTPException(status_code=500, detail="Video conversion failed. Please try again.")
 
@@ -951,6 +915,9 @@ async def save_cookies(
             async with aiofiles.open(cookie_file_path, 'w', encoding='utf-8') as f:
                 await f.write(cookie_content.strip() + '\n')
             
+            # Downloaders cache their cookies file check; make them pick up the new file now
+            downloaders[platform].reload_cookie_cache()
+            
             logger.info(f"User {current_user} successfully saved cookies for {platform} to {cookie_file_path}")
             
             return {
@@ -989,7 +956,7 @@ async def progress_stream(
                 "status": "info",
                 "message": "Download started",
                 "progress": 0,
-                "timestamp": str(asyncio.get_event_loop().time())
+                "timestamp": str(asyncio.get_running_loop().time())
             }
             yield f"data: {json.dumps(progress_data)}\n\n"
             
@@ -1000,7 +967,7 @@ async def progress_stream(
                     "status": "downloading",
                     "message": f"Downloading... {i * 10}%",
                     "progress": i * 10,
-                    "timestamp": str(asyncio.get_event_loop().time())
+                    "timestamp": str(asyncio.get_running_loop().time())
                 }
                 yield f"data: {json.dumps(progress_data)}\n\n"
             
@@ -1009,7 +976,7 @@ async def progress_stream(
                 "status": "finished",
                 "message": "Download completed!",
                 "progress": 100,
-                "timestamp": str(asyncio.get_event_loop().time())
+                "timestamp": str(asyncio.get_running_loop().time())
             }
             yield f"data: {json.dumps(progress_data)}\n\n"
             
@@ -1018,7 +985,7 @@ async def progress_stream(
                 "status": "error",
                 "message": f"Progress tracking error: {str(e)}",
                 "progress": 0,
-                "timestamp": str(asyncio.get_event_loop().time())
+                "timestamp": str(asyncio.get_running_loop().time())
             }
             yield f"data: {json.dumps(error_data)}\n\n"
     
@@ -0,0 +1,118 @@
+import json
+import math
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from ..config import settings
+from .logger import logger
+
+
+class BandwidthEstimator:
+    """Per-host throughput estimates used to size yt-dlp HTTP chunks and fragment concurrency
+
+    Samples are per-connection throughput (bytes/s) from finished downloads; the
+    harmonic mean keeps one fast outlier from inflating the estimate. State is
+    persisted to a small JSON file so restarts don't begin cold.
+    """
+
+    CHUNK_SIZES = (256 * 1024, 1024 * 1024, 4 * 1024 * 1024, 10 * 1024 * 1024)
+    MIN_CONCURRENCY = 2
+    MAX_CONCURRENCY = 8
+    # Handshake + slow-start rounds paid per chunk request, and the share of time we want spent transferring
+    OVERHEAD_RTTS = 2
+    TARGET_EFFICIENCY = 0.9
+
+    def __init__(self, state_path: Path, window: int = 8, rtt: float = 0.1,
+                 target_throughput: float = 8 * 1024 * 1024):
+        self.state_path = state_path
+        self.window = window
+        self.rtt = rtt
+        self.target_throughput = target_throughput
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def recommend(self, host: str) -> Tuple[int, int]:
+        """Return ``(http_chunk_size, concurrent_fragment_downloads)`` for ``host``"""
+        bandwidth = self.estimate(host)
+        if bandwidth is None:
+            # Cold start: small chunks get bytes flowing without waiting out slow-start
+            return self.CHUNK_SIZES[0], self.MIN_CONCURRENCY * 2
+
+        # A chunk must be long enough that per-request overhead stays under 10% of its transfer time
+        bdp = bandwidth * self.rtt
+        min_chunk = self.OVERHEAD_RTTS * bdp * self.TARGET_EFFICIENCY / (1 - self.TARGET_EFFICIENCY)
+        chunk_size = next((size for size in self.CHUNK_SIZES if size >= min_chunk), self.CHUNK_SIZES[-1])
+
+        # Add parallel fragments until the per-connection rate reaches the target throughput
+        concurrency = math.ceil(self.target_throughput / bandwidth)
+        concurrency = max(self.MIN_CONCURRENCY, min(self.MAX_CONCURRENCY, concurrency))
+        return chunk_size, concurrency
+
+    def estimate(self, host: str) -> Optional[float]:
+        """Harmonic mean of recent per-connection throughput for ``host``, or None if unknown"""
+        with self._lock:
+            samples = list(self._samples.get(host, ()))
+        if not samples:
+            return None
+        return len(samples) / sum(1 / sample for sample in samples)
+
+    def update(self, host: str, downloaded_bytes: int, elapsed: float, concurrency: int = 1):
+        """Record a finished transfer and persist the updated samples"""
+        if not downloaded_bytes or not elapsed or elapsed <= 0:
+            return
+
+        sample = downloaded_bytes / elapsed / max(concurrency, 1)
+        with self._lock:
+            self._samples.setdefault(host, deque(maxlen=self.window)).append(sample)
+            snapshot = {key: list(values) for key, values in self._samples.items()}
+            # Write under the lock so concurrent downloads don't interleave the file
+            try:
+                self.state_path.write_text(json.dumps(snapshot))
+            except OSError as exc:
+                logger.debug(f"Failed to persist bandwidth estimates: {exc}")
+
+    def progress_hook(self, host: str, concurrency: int):
+        """Build a yt-dlp progress hook that feeds finished downloads into the estimator
+
+        ``concurrency`` only divides samples from fragmented transfers; a progressive
+        download uses a single connection whatever the fragment setting says.
+        """
+        fragmented = False
+
+        def hook(d: Dict[str, Any]):
+            nonlocal fragmented
+            status = d.get('status')
+            if status == 'downloading':
+                # The 'finished' event omits fragment info, so remember it from the progress events
+                fragmented = fragmented or bool(d.get('fragment_count'))
+            elif status == 'finished':
+                size = d.get('total_bytes') or d.get('downloaded_bytes') or 0
+                self.update(host, size, d.get('elapsed') or 0, concurrency if fragmented else 1)
+                fragmented = False
+        return hook
+
+    def _load(self):
+        try:
+            data = json.loads(self.state_path.read_text())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            logger.debug(f"Ignoring unreadable bandwidth state {self.state_path}: {exc}")
+            return
+
+        if not isinstance(data, dict):
+            return
+
+        for host, values in data.items():
+            if not isinstance(values, list):
+                continue
+            samples = [float(value) for value in values if isinstance(value, (int, float)) and value > 0]
+            if samples:
+                self._samples[host] = deque(samples, maxlen=self.window)
+
+
+# Shared estimator persisted next to the app database
+bw_estimator = BandwidthEstimator(settings.BANDWIDTH_STATE_PATH)
@@ -0,0 +1,70 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from ..config import settings
+
+# Created lazily so importing this module (including inside worker processes) stays cheap
+_extract_pool: Optional[ProcessPoolExecutor] = None
+_download_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_extract_pool() -> ProcessPoolExecutor:
+    """Process pool for CPU-heavy yt-dlp metadata extraction"""
+    global _extract_pool
+    if _extract_pool is None:
+        # spawn avoids forking a process that already runs an event loop and threads
+        _extract_pool = ProcessPoolExecutor(
+            max_workers=settings.EXTRACT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_ydl_worker,
+        )
+    return _extract_pool
+
+
+def _init_ydl_worker():
+    """Import yt-dlp and build its extractor registry once per worker, not on the first request"""
+    from yt_dlp.extractor import gen_extractor_classes
+
+    gen_extractor_classes()
+
+
+def get_download_executor() -> ThreadPoolExecutor:
+    """Thread pool for blocking yt-dlp calls, kept apart from the default executor"""
+    global _download_executor
+    if _download_executor is None:
+        _download_executor = ThreadPoolExecutor(
+            max_workers=settings.DOWNLOAD_THREADS,
+            thread_name_prefix="ydl-download",
+        )
+    return _download_executor
+
+
+def extract_info_remote(url: str, options: Dict[str, Any], process: bool = True) -> Dict[str, Any]:
+    """Run ``extract_info`` in a worker process and return a picklable info dict
+
+    ``process=False`` returns the extractor's raw result without format selection;
+    redirects to another extractor are still resolved.
+    """
+    from .ydl_pool import ydl_pool
+
+    try:
+        with ydl_pool.acquire(options) as ydl:
+            info = ydl.extract_info(url, download=False, process=process)
+            if not process and info and info.get('_type') in ('url', 'url_transparent'):
+                info = ydl.process_ie_result(info, download=False)
+            return ydl.sanitize_info(info)
+    except Exception as exc:
+        # yt-dlp exceptions carry exc_info that does not survive pickling
+        raise Exception(str(exc)) from None
+
+
+def shutdown_executors():
+    """Shut down the extraction and download pools (called on app shutdown)"""
+    global _extract_pool, _download_executor
+    if _extract_pool is not None:
+        _extract_pool.shutdown(wait=False, cancel_futures=True)
+        _extract_pool = None
+    if _download_executor is not None:
+        _download_executor.shutdown(wait=False)
+        _download_executor = None
@@ -0,0 +1,74 @@
+import asyncio
+import heapq
+import itertools
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .logger import logger
+
+
+class FileReaper:
+    """Delete scheduled temp files once their deadline passes, using a single background task"""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Path]] = []
+        self._counter = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def schedule(self, filepath: Path, delay: float = 5):
+        """Delete ``filepath`` after ``delay`` seconds"""
+        loop = asyncio.get_running_loop()
+        heapq.heappush(self._heap, (loop.time() + delay, next(self._counter), Path(filepath)))
+        self.start()
+        self._wakeup.set()
+
+    def start(self):
+        """Start the reaper task if it isn't already running"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the reaper and delete everything still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while self._heap:
+            _, _, filepath = heapq.heappop(self._heap)
+            self._unlink(filepath)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = loop.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, filepath = heapq.heappop(self._heap)
+                self._unlink(filepath)
+
+            # Sleep until the next deadline, or until a new file is scheduled
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    @staticmethod
+    def _unlink(filepath: Path):
+        try:
+            os.unlink(filepath)
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            logger.debug(f"Failed to remove {filepath}: {exc}")
+
+
+# Shared reaper for delayed temp-file cleanup
+file_reaper = FileReaper()
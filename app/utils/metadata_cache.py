@@ -0,0 +1,78 @@
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from ..config import settings
+from .logger import logger
+
+# Share/tracking parameters that never change which video a URL points to
+_TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'igshid', 'si', 's', 't', 'ref', 'ref_src', 'ref_url',
+    'is_from_webapp', 'sender_device', 'sender_web_id', 'is_copy_url', 'web_id',
+    'share_app_id', 'share_item_id', 'share_link_id', 'tt_from', 'u_code', '_r', '_t',
+})
+
+
+@lru_cache(maxsize=8192)
+def canonical_url(url: str) -> str:
+    """Normalize a URL for cache lookups by dropping fragments and tracking parameters"""
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _TRACKING_PARAMS and not key.lower().startswith('utm_')
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower() or 'https', parts.netloc.lower(), path, urlencode(query), ''))
+
+
+class MetadataCache:
+    """In-process LRU cache with a per-entry TTL for video metadata
+
+    Only touched from the event loop, so no lock is needed around the dict.
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 900):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(url: str, variant: str) -> str:
+        key = canonical_url(url)
+        return f"{key}|{variant}" if variant else key
+
+    def get(self, url: str, variant: str = '') -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached metadata for ``url`` if it is still fresh"""
+        key = self._key(url, variant)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            logger.debug(f"Metadata cache hit for {key} (hits={self.hits}, misses={self.misses})")
+            return dict(entry[1])
+
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        logger.debug(f"Metadata cache miss for {key} (hits={self.hits}, misses={self.misses})")
+        return None
+
+    def set(self, url: str, metadata: Dict[str, Any], variant: str = ''):
+        """Store metadata for ``url``, evicting the least recently used entries when full"""
+        key = self._key(url, variant)
+        self._entries[key] = (time.monotonic(), dict(metadata))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, url: str, variant: str = ''):
+        """Drop cached metadata for ``url`` (e.g. after a failed download)"""
+        self._entries.pop(self._key(url, variant), None)
+
+
+# Shared cache for platform get_video_info results
+metadata_cache = MetadataCache(ttl=settings.METADATA_CACHE_TTL)
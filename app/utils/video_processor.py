@@ -10,8 +10,6 @@ class VideoProcessor:
                         end_time: Optional[float] = None) -> Path:
         """Trim video using ffmpeg with stream copy when possible."""
 
-        loop = asyncio.get_event_loop()
-
         def process() -> Path:
             start = float(start_time) if start_time is not None else None
             end = float(end_time) if end_time is not None else None
@@ -52,12 +50,10 @@ class VideoProcessor:
 
             return output_path
 
-        return await loop.run_in_executor(None, process)
+        return await asyncio.to_thread(process)
     
     async def get_video_duration(self, filepath: Path) -> float:
         """Get video duration in seconds"""
-        loop = asyncio.get_event_loop()
-        
         def get_duration():
             probe = ffmpeg.probe(str(filepath))
             video_stream = next((stream for stream in probe['streams'] 
@@ -66,13 +62,11 @@ class VideoProcessor:
                 return float(video_stream['duration'])
             return 0.0
         
-        return await loop.run_in_executor(None, get_duration)
+        return await asyncio.to_thread(get_duration)
     
     async def ensure_mp4_compatibility(self, input_path: Path, output_path: Path) -> Path:
         """Convert video to MP4 format with standard codecs for maximum compatibility"""
         
-        loop = asyncio.get_event_loop()
-        
         def convert():
             try:
                 # Check if input is already MP4 with compatible codecs
@@ -122,4 +116,4 @@ class VideoProcessor:
                     # If all else fails, return original
                     return input_path
         
-        return await loop.run_in_executor(None, convert)
+        return await asyncio.to_thread(convert)
@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Tuple
+
+import yt_dlp
+
+from .logger import logger
+
+
+class YoutubeDLPool:
+    """Reuse yt-dlp instances across metadata extractions with identical options.
+
+    Building a ``YoutubeDL`` loads the extractor registry and sets up the
+    networking stack, so instances are kept per option signature and handed
+    out to one caller at a time (``YoutubeDL`` is not thread-safe). Options with a
+    ``cookiefile`` are never pooled.
+    """
+
+    def __init__(self, max_idle_per_key: int = 4, max_keys: int = 16, max_age: float = 1800):
+        self.max_idle_per_key = max_idle_per_key
+        self.max_keys = max_keys
+        # Retire instances periodically so cookies and cached player data don't go stale
+        self.max_age = max_age
+        self._idle: "OrderedDict[str, List[Tuple[float, yt_dlp.YoutubeDL]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(options: Dict[str, Any]) -> str:
+        return json.dumps(options, sort_keys=True, default=str)
+
+    @contextmanager
+    def acquire(self, options: Dict[str, Any]):
+        """Yield a ``YoutubeDL`` built from ``options``, reusing an idle one when possible"""
+        if options.get('cookiefile'):
+            # The cookie jar is read once per instance, so a pooled one would keep serving the
+            # old session after the file is rotated or replaced; use a one-off instance instead
+            ydl = yt_dlp.YoutubeDL(dict(options))
+            try:
+                yield ydl
+            finally:
+                self._close(ydl)
+            return
+
+        key = self._signature(options)
+        now = time.monotonic()
+
+        ydl = None
+        expired: List[yt_dlp.YoutubeDL] = []
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                created, candidate = idle.pop()
+                if now - created < self.max_age:
+                    ydl = candidate
+                    break
+                expired.append(candidate)
+
+        for stale_ydl in expired:
+            self._close(stale_ydl)
+
+        if ydl is None:
+            created = now
+            ydl = yt_dlp.YoutubeDL(dict(options))
+
+        try:
+            yield ydl
+        except Exception:
+            # Don't hand out an instance whose state may be half-updated
+            self._close(ydl)
+            raise
+
+        evicted: List[yt_dlp.YoutubeDL] = []
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            self._idle.move_to_end(key)
+            if len(idle) < self.max_idle_per_key:
+                idle.append((created, ydl))
+                ydl = None
+
+            # Options such as generated cookie files rotate; drop the least recently used signatures
+            while len(self._idle) > self.max_keys:
+                _, stale = self._idle.popitem(last=False)
+                evicted.extend(stale_ydl for _, stale_ydl in stale)
+
+        if ydl is not None:
+            evicted.append(ydl)
+        for stale_ydl in evicted:
+            self._close(stale_ydl)
+
+    def clear(self):
+        """Close every idle instance so the next acquire builds fresh ones (e.g. after new cookies are saved)"""
+        with self._lock:
+            stale = [ydl for idle in self._idle.values() for _, ydl in idle]
+            self._idle.clear()
+        for ydl in stale:
+            self._close(ydl)
+
+    def _close(self, ydl: yt_dlp.YoutubeDL):
+        # close() runs save_cookies(), which would write this instance's possibly stale
+        # cookie jar over the user's cookie file; only release the network handlers
+        ydl.params.pop('cookiefile', None)
+        try:
+            ydl.close()
+        except Exception as exc:
+            logger.debug(f"Failed to close pooled yt-dlp instance: {exc}")
+
+
+# Shared pool for metadata extraction
+ydl_pool = YoutubeDLPool()